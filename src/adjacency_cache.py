@@ -0,0 +1,145 @@
+""" Filtered adjacency cache
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import compress
+
+
+class FilteredAdjacency(object):
+    """ The arcs of a route map which pass a set of static tests, in
+        compressed sparse rows like the route map itself.
+
+    Attributes:
+        offsets (array): First valid arc of each city, indexed by city.
+        ends (array): Valid arc after the last one of each city, indexed by
+            city.
+        arcs (array): The valid arcs, sorted by city.
+        valid (bytearray): Whether each arc of the map is valid, indexed by
+            arc.
+        tests: The (column, test) pairs every valid arc must pass.
+    """
+
+    def __init__(self, route_map, tests):
+        """ Filters the arcs of a route map.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            tests: The (column, test) pairs every valid arc must pass.
+        """
+        self.tests = tests
+        checks = list(tests)
+        if route_map.dead:
+            checks.append((route_map.arc_connection, (-1).__lt__))
+        valid = range(len(route_map.neighbour))
+        for column, test in checks:
+            if isinstance(valid, range):
+                values = column[valid.start:valid.stop]
+            else:
+                values = map(column.__getitem__, valid)
+            valid = list(compress(valid, map(test, values)))
+        self.arcs = array('i', valid)
+
+        self.valid = bytearray(len(route_map.neighbour))
+        for arc in self.arcs:
+            self.valid[arc] = 1
+
+        self.offsets = array('i', (bisect_left(self.arcs, offset)
+                                   for offset in route_map.offsets))
+        self.ends = array('i', (bisect_left(self.arcs, end)
+                                for end in route_map.ends))
+
+    def __getitem__(self, node):
+        """ Valid arcs leaving a city.
+
+        Args:
+            node (int): Number of the city.
+
+        Returns:
+            An array with the valid arcs of the city.
+        """
+        return self.arcs[self.offsets[node]:self.ends[node]]
+
+    def passes(self, arc):
+        """ Tests an arc again, with its current values.
+
+        Args:
+            arc (int): Number of the arc.
+
+        Returns:
+            Whether the arc passes every test.
+        """
+        return all(test(column[arc]) for column, test in self.tests)
+
+    def nbytes(self):
+        """ Memory used by the arrays, in bytes. """
+        return (self.offsets.itemsize * len(self.offsets) +
+                self.ends.itemsize * len(self.ends) +
+                self.arcs.itemsize * len(self.arcs) +
+                len(self.valid))
+
+
+class AdjacencyCache(object):
+    """ Least recently used cache of filtered adjacencies, keyed by the
+        signature of the static constraints that filter them.
+
+    Attributes:
+        CAPACITY (int): Default memory cap, in bytes.
+        capacity (int): Memory cap, in bytes.
+        nbytes (int): Memory currently used by the cached adjacencies.
+        entries (OrderedDict): The cached adjacencies, least recently used
+            first.
+    """
+
+    CAPACITY = 64 * 2**20
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.nbytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, route_map, signature, tests):
+        """ Gets the adjacency filtered by some static tests, building it if
+            it is not cached.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            signature: Hashable signature of the static constraints.
+            tests: The (column, test) pairs of the static constraints.
+
+        Returns:
+            The FilteredAdjacency.
+        """
+        if signature in self.entries:
+            self.entries.move_to_end(signature)
+            return self.entries[signature]
+
+        adjacency = FilteredAdjacency(route_map, tests)
+        if adjacency.nbytes() > self.capacity:
+            return adjacency
+
+        self.entries[signature] = adjacency
+        self.nbytes += adjacency.nbytes()
+        while self.nbytes > self.capacity:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes()
+        return adjacency
+
+    def discard(self, arcs):
+        """ Drops the cached adjacencies in which some arcs, changed in
+            place, became valid or invalid.
+
+        Args:
+            arcs: The changed arcs.
+        """
+        for signature, adjacency in list(self.entries.items()):
+            if any(adjacency.valid[arc] != adjacency.passes(arc)
+                   for arc in arcs):
+                del self.entries[signature]
+                self.nbytes -= adjacency.nbytes()
+
+    def clear(self):
+        """ Drops every cached adjacency. """
+        self.entries.clear()
+        self.nbytes = 0
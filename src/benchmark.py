@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+""" Benchmark of the search engines
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+
+from client import ClientParser
+from routemap import RouteMap
+from run import ALGORITHMS, QUEUES
+
+
+def percentile(values, fraction):
+    """ Percentile of some values, interpolated between the closest ranks.
+
+    Args:
+        values: The values, sorted.
+        fraction (float): Fraction of the values below the percentile.
+
+    Returns:
+        The percentile, 0 if there are no values.
+    """
+    if not values:
+        return 0
+    position = (len(values) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def benchmark(route_map, clients, algorithm, queue, sec_optim, warmup, repeat):
+    """ Measures an engine routing every client.
+
+    The warm-up passes also build what the engine keeps in the route map,
+    like the landmarks or the timetable. Peak memory is measured in one more
+    pass, since tracing the allocations slows the routing down.
+
+    Args:
+        route_map (RouteMap): RouteMap object.
+        clients: The Client objects.
+        algorithm: Class of the algorithm.
+        queue: Class of the priority queue backend.
+        sec_optim (bool): Optimize secondary weight.
+        warmup (int): Number of passes which are not measured.
+        repeat (int): Number of measured passes.
+
+    Returns:
+        Dictionary with the latency percentiles, in milliseconds, the
+        throughput, in clients per second, and the peak memory, in KiB.
+    """
+    for _ in range(warmup):
+        for client in clients:
+            client.route(route_map, algorithm, sec_optim, queue)
+
+    latencies = []
+    for _ in range(repeat):
+        for client in clients:
+            start = time.perf_counter()
+            client.route(route_map, algorithm, sec_optim, queue)
+            latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for client in clients:
+        client.route(route_map, algorithm, sec_optim, queue)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": total / len(latencies) * 1000 if latencies else 0,
+        "throughput": len(latencies) / total if total else 0,
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """ Compares a report with a previous one.
+
+    Args:
+        report (dict): The new report.
+        baseline (dict): The previous report.
+        tolerance (float): Slowdown of the median latency allowed, as a
+            fraction of the previous one.
+
+    Returns:
+        List with a message for each engine that got slower.
+    """
+    messages = []
+    for name, result in report["engines"].items():
+        previous = baseline["engines"].get(name)
+        if previous is None or not previous["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / previous["p50_ms"]
+        if ratio > 1 + tolerance:
+            messages.append("{}: median latency {:.3f} ms, was {:.3f} ms "
+                            "({:+.0%})".format(name, result["p50_ms"],
+                                               previous["p50_ms"], ratio - 1))
+    return messages
+
+
+def main():
+    """ Runs the benchmark of the chosen engines and writes the JSON report.
+    """
+
+    parser = ArgumentParser(description="Benchmark the search engines",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemap",
+                        help="file where the map is defined")
+    parser.add_argument("client",
+                        help="file where all clients' requests are defined")
+    parser.add_argument("-a", "--algorithms",
+                        help="comma separated engines to measure",
+                        default=",".join(ALGORITHMS))
+    parser.add_argument("-q", "--queue",
+                        choices=QUEUES.keys(),
+                        default="heap",
+                        help="Priority queue backend")
+    parser.add_argument("-s", "--secondary-optimization",
+                        action="store_true",
+                        help="Enable secondary parameter optimization")
+    parser.add_argument("-w", "--warmup",
+                        help="number of passes over the clients which are \
+                            not measured",
+                        type=int,
+                        default=1)
+    parser.add_argument("-r", "--repeat",
+                        help="number of measured passes over the clients",
+                        type=int,
+                        default=3)
+    parser.add_argument("-o", "--output",
+                        help="file where the JSON report is written (- for \
+                            the standard output), named *.bench.json to be \
+                            ignored by git in samples/",
+                        default="-")
+    parser.add_argument("-b", "--baseline",
+                        help="previous JSON report to check for regressions")
+    parser.add_argument("-t", "--tolerance",
+                        help="slowdown of the median latency allowed against \
+                            the baseline",
+                        type=float,
+                        default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.INFO)
+
+    names = args.algorithms.split(",")
+    for name in names:
+        if name not in ALGORITHMS:
+            parser.error("unknown engine {}".format(name))
+
+    route_map = RouteMap(args.routemap)
+    clients = list(ClientParser(args.client).clients.values())
+    queue = QUEUES[args.queue]["class"]
+
+    report = {
+        "map": args.routemap,
+        "client": args.client,
+        "cities": len(route_map.cities),
+        "connections": len(route_map.connection_arc),
+        "clients": len(clients),
+        "queue": args.queue,
+        "secondary_optimization": args.secondary_optimization,
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "engines": {},
+    }
+    for name in names:
+        logging.info("Measuring {}".format(ALGORITHMS[name]["label"]))
+        report["engines"][name] = benchmark(route_map, clients,
+                                            ALGORITHMS[name]["class"], queue,
+                                            args.secondary_optimization,
+                                            args.warmup, args.repeat)
+
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.output, 'w') as json_file:
+            json_file.write(text)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as json_file:
+            slower = regressions(report, json.load(json_file), args.tolerance)
+        for message in slower:
+            logging.warning(message)
+        if slower:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
 """ Client's requests
 """
 
+from itertools import islice
+
 from constraints import *
+from instrumentation import record
+
+# Number of clients read, grouped and routed at once by default
+BATCH_SIZE = 1024
 
 
 class ClientParser(object):
@@ -55,6 +61,47 @@ class ClientParser(object):
             self.clients[new_client.number] = new_client
 
 
+def read_clients(client_file):
+    """ Parses the clients' requests lazily, one line at a time.
+
+    Args:
+        client_file (file): The file object of the clients' requests, at its
+            beginning.
+
+    Yields:
+        Each Client, in the order of the file.
+    """
+
+    client_file.readline() # number of clients
+    for line in client_file:
+        if line.strip():
+            yield Client(line)
+
+
+def batches(clients, size):
+    """ Splits the clients into consecutive batches.
+
+    Args:
+        clients: Iterable with the Client objects.
+        size (int): Number of clients per batch, all of them in a single
+            batch if not positive, which keeps them all in memory.
+
+    Yields:
+        Lists with the clients of each batch.
+    """
+
+    clients = iter(clients)
+    if size <= 0:
+        yield list(clients)
+        return
+
+    while True:
+        batch = list(islice(clients, size))
+        if not batch:
+            return
+        yield batch
+
+
 class Client(object):
     """ A client.
 
@@ -106,7 +153,7 @@ class Client(object):
             constraint = self.CONSTRAINT_TYPES[constraint_type](constraint_param)
             self.constraints.append(constraint)
 
-    def route(self, route_map, algorithm, sec_optim):
+    def route(self, route_map, algorithm, sec_optim, queue, cache=None):
         """ Routes each client.
 
         Args:
@@ -114,17 +161,163 @@ class Client(object):
                 between cities.
             algorithm (GeneralSearch): Algorithm specified by the program user.
             sec_optim (bool): Optimize secondary weight.
+            queue (Frontier): Priority queue backend.
+            cache (ResultCache): Cache of the routes already found, if any.
 
         Returns:
             The string with the route information towards the solution file.
         """
 
+        route = self.profile_route(route_map, algorithm, sec_optim)
+        if route is not None:
+            return "{} {}".format(self.number, route)
+
+        if cache is not None:
+            key = cache.key(self, algorithm, sec_optim, queue)
+            route = cache.get(key)
+            if route is not None:
+                return "{} {}".format(self.number, route)
+
         alg = algorithm(route_map,
                         self,
-                        sec_optim)
+                        sec_optim,
+                        queue)
         alg.calculate()
+        record(alg, [self.number])
+        route = alg.recreate()
+
+        if cache is not None:
+            cache.put(key, route)
 
         return "{} {}".format(
             self.number,
-            alg.recreate()
+            route
         )
+
+    def profile_route(self, route_map, algorithm, sec_optim):
+        """ Answers the client from the precomputed profiles of the map.
+
+        Only the exact algorithms are replaced by the profiles.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            algorithm (GeneralSearch): Algorithm specified by the program user.
+            sec_optim (bool): Optimize secondary weight.
+
+        Returns:
+            The route information, or None if it has to be searched.
+        """
+
+        if route_map.profiles is None or not algorithm.EXACT:
+            return None
+        return route_map.profiles.answer(self, sec_optim)
+
+    def group_key(self):
+        """ Key shared by the clients whose requests only differ in the goal.
+
+        Returns:
+            Tuple with the initial node, starting time, optimization and the
+            signature of the constraints.
+        """
+
+        return (self.initial,
+                self.ti,
+                self.optimization,
+                tuple(sorted(c.signature() for c in self.constraints)))
+
+
+def group_clients(clients, multi_goal):
+    """ Groups the clients which can share the same search.
+
+    Args:
+        clients: The Client objects.
+        multi_goal (bool): Whether the algorithm can search for several
+            goals at once, otherwise every client gets its own group.
+
+    Returns:
+        List with the groups, as lists of clients, in the order of their
+        first client.
+    """
+
+    if not multi_goal:
+        return [[client] for client in clients]
+
+    groups = {}
+    for client in clients:
+        groups.setdefault(client.group_key(), []).append(client)
+    return list(groups.values())
+
+
+def route_group(group, route_map, algorithm, sec_optim, queue, cache=None):
+    """ Routes a group of clients with a single search.
+
+    The search goes on until every goal of the group not found in the
+    profiles or the cache is reached, and each path is recreated from the same tree.
+
+    Args:
+        group: Client objects which only differ in the goal.
+        route_map (RouteMap): RouteMap object containing the connections
+            between cities.
+        algorithm (GeneralSearch): Algorithm specified by the program user.
+        sec_optim (bool): Optimize secondary weight.
+        queue (Frontier): Priority queue backend.
+        cache (ResultCache): Cache of the routes already found, if any.
+
+    Returns:
+        List with the number and route information of each client.
+    """
+
+    if len(group) == 1:
+        return [(group[0].number,
+                 group[0].route(route_map, algorithm, sec_optim, queue,
+                                cache))]
+
+    routes = {}
+    for client in group:
+        routes[client.number] = client.profile_route(route_map, algorithm,
+                                                     sec_optim)
+        if routes[client.number] is None and cache is not None:
+            routes[client.number] = cache.get(
+                cache.key(client, algorithm, sec_optim, queue))
+
+    missing = [client for client in group if routes.get(client.number) is None]
+    if missing:
+        alg = algorithm(route_map,
+                        missing[0],
+                        sec_optim,
+                        queue,
+                        {client.goal for client in missing})
+        alg.calculate()
+        record(alg, [client.number for client in missing])
+
+        for client in missing:
+            routes[client.number] = alg.recreate(client.goal)
+            if cache is not None:
+                cache.put(cache.key(client, algorithm, sec_optim, queue),
+                          routes[client.number])
+
+    return [(client.number, "{} {}".format(client.number,
+                                           routes[client.number]))
+            for client in group]
+
+
+def in_client_order(numbers, results):
+    """ Puts the paths of routed groups back in the order of the clients.
+
+    Args:
+        numbers: Client numbers, in the order of the solution file.
+        results: Iterable with the result of route_group for each group, in
+            the order of their first client.
+
+    Yields:
+        The path of each client, as soon as the ones before it are known.
+    """
+
+    numbers = iter(numbers)
+    next_number = next(numbers, None)
+    pending = {}
+    for result in results:
+        pending.update(result)
+        while next_number in pending:
+            yield pending.pop(next_number)
+            next_number = next(numbers, None)
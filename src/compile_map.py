@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+""" Route map compiler
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import logging
+
+from routemap import RouteMap
+
+
+def main():
+    """ Compiles a text map file into the binary format memory mapped by
+        RouteMap.
+    """
+
+    parser = ArgumentParser(description="Compile a map file",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemap",
+                        help="file where the map is defined")
+    parser.add_argument("-o", "--output",
+                        help="compiled map file, by default the map file with \
+                            the .mapc extension")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.INFO)
+
+    output = args.output
+    if output is None:
+        output = args.routemap[:args.routemap.rfind('.')] + ".mapc"
+
+    logging.info("Parsing the route map file")
+    route_map = RouteMap(args.routemap)
+    route_map.save(output)
+    logging.info("Compiled {} connections into {}".format(
+        len(route_map.connection_arc), output))
+
+if __name__ == '__main__':
+    main()
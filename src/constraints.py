@@ -1,9 +1,18 @@
 """ Constraints of a Client
 """
 
+from itertools import compress
+
 
 class Constraint(object):
-    """ A constraint to a client's request """
+    """ A constraint to a client's request
+
+    Attributes:
+        STATIC (bool): Whether the constraint only depends on the connection,
+            and not on the route so far.
+    """
+
+    STATIC = True
 
     def check_connection(self, connection, current_cost, current_time):
         """ Checks if a connection is valid considering a specified criterion.
@@ -16,6 +25,31 @@ class Constraint(object):
 
         pass
 
+    def signature(self):
+        """ Hashable description of the constraint.
+
+        Returns:
+            The name of the constraint class followed by its parameters.
+        """
+
+        return (type(self).__name__,) + tuple(sorted(vars(self).items()))
+
+    def arc_test(self, route_map, current_cost, current_time):
+        """ Compiles the constraint into a test over one of the arc arrays.
+
+        Arguments:
+            route_map (RouteMap): route map with the arc arrays.
+            current_cost (int): current total route cost.
+            current_time (int): current total route time.
+
+        Returns:
+            A (column, test) pair, where column is the arc array to check and
+            test a function which, given the value of an arc in it, tells if
+            the arc is valid. None if every arc is valid.
+        """
+
+        pass
+
 
 class ConstTransport(Constraint):
     """ Constraint for the type of transport not to use.
@@ -37,6 +71,12 @@ class ConstTransport(Constraint):
 
         return connection.transport != self.transport_type
 
+    def arc_test(self, route_map, current_cost, current_time):
+        if self.transport_type not in route_map.transports:
+            return None
+        code = route_map.transports.index(self.transport_type)
+        return route_map.transport, code.__ne__
+
 
 class ConstConnTime(Constraint):
     """ Constraint for the time limit for each connection.
@@ -58,6 +98,9 @@ class ConstConnTime(Constraint):
 
         return connection.duration <= self.max_connection_time
 
+    def arc_test(self, route_map, current_cost, current_time):
+        return route_map.duration, self.max_connection_time.__ge__
+
 
 class ConstConnCost(Constraint):
     """ Constraint for the cost limit for each connection.
@@ -79,6 +122,9 @@ class ConstConnCost(Constraint):
 
         return connection.cost <= self.max_connection_cost
 
+    def arc_test(self, route_map, current_cost, current_time):
+        return route_map.cost, self.max_connection_cost.__ge__
+
 
 class ConstTotalTime(Constraint):
     """ Constraint for the time limit for the whole route.
@@ -87,6 +133,8 @@ class ConstTotalTime(Constraint):
         max_total_time (int): Maximum time for total route.
     """
 
+    STATIC = False
+
     def __init__(self, param):
         self.max_total_time = int(param)
 
@@ -100,6 +148,9 @@ class ConstTotalTime(Constraint):
 
         return connection.duration + duration_so_far <= self.max_total_time
 
+    def arc_test(self, route_map, current_cost, duration_so_far):
+        return route_map.duration, (self.max_total_time - duration_so_far).__ge__
+
 
 class ConstTotalCost(Constraint):
     """ Constraint for the cost limit for the whole route.
@@ -108,6 +159,8 @@ class ConstTotalCost(Constraint):
         max_total_cost (int): Maximum cost for total route.
     """
 
+    STATIC = False
+
     def __init__(self, param):
         self.max_total_cost = int(param)
 
@@ -120,3 +173,99 @@ class ConstTotalCost(Constraint):
         """
 
         return connection.cost + current_cost <= self.max_total_cost
+
+    def arc_test(self, route_map, current_cost, current_time):
+        return route_map.cost, (self.max_total_cost - current_cost).__ge__
+
+
+class CompiledConstraints(object):
+    """ All the constraints of a client compiled into arc array tests.
+
+    Each test maps the values of the candidate arcs in one column to a
+    boolean mask, and the arcs are compressed with it, so that no Python
+    function is called per arc. The static constraints are applied once to
+    the whole map, the ones which reject more arcs earlier, and the filtered
+    adjacency is shared, through the route map's cache, by every client with
+    the same static constraints. Only the constraints on the whole route are
+    checked for each node, from its cost and time.
+
+    Attributes:
+        SAMPLE (int): Maximum number of arcs used to measure the selectivity.
+        route_map (RouteMap): route map with the arc arrays.
+        adjacency (FilteredAdjacency): The arcs which respect the static
+            constraints, None if there are none.
+        dynamic: The constraints on the whole route.
+    """
+
+    SAMPLE = 4096
+
+    def __init__(self, constraints, route_map):
+        """ Compiles the constraints of a client.
+
+        Arguments:
+            constraints: The client's Constraint objects.
+            route_map (RouteMap): route map with the arc arrays.
+        """
+        self.route_map = route_map
+        self.dynamic = [c for c in constraints if not c.STATIC]
+
+        static = [c for c in constraints
+                  if c.STATIC and c.arc_test(route_map, 0, 0)]
+        if not static:
+            self.adjacency = None
+            return
+
+        signature = tuple(sorted(set(c.signature() for c in static)))
+        tests = sorted((c.arc_test(route_map, 0, 0) for c in static),
+                       key=self.selectivity)
+        self.adjacency = route_map.adjacency_cache.get(route_map,
+                                                       signature,
+                                                       tests)
+
+    def __bool__(self):
+        return bool(self.adjacency or self.dynamic)
+
+    def selectivity(self, arc_test):
+        """ Measures the fraction of the arcs of the map which pass a test.
+
+        Arguments:
+            arc_test: A (column, test) pair.
+
+        Returns:
+            The fraction of a sample of the arcs which pass the test.
+        """
+        column, test = arc_test
+        sample = column[::len(column) // self.SAMPLE + 1]
+        if not sample:
+            return 1
+        return sum(map(test, sample)) / len(sample)
+
+    def valid_arcs(self, node, current_cost, current_time):
+        """ Selects the valid arcs leaving a city.
+
+        Arguments:
+            node (int): Number of the city.
+            current_cost (int): current total route cost.
+            current_time (int): current total route time.
+
+        Returns:
+            The arcs which respect all the constraints.
+        """
+        if self.adjacency is not None:
+            arcs = self.adjacency[node]
+        else:
+            arcs = self.route_map.arcs(node)
+
+        for constraint in self.dynamic:
+            column, test = constraint.arc_test(self.route_map,
+                                               current_cost,
+                                               current_time)
+            if isinstance(arcs, range):
+                values = column[arcs.start:arcs.stop]
+            else:
+                values = map(column.__getitem__, arcs)
+            arcs = list(compress(arcs, map(test, values)))
+            if not arcs:
+                break
+
+        return arcs
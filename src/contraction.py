@@ -0,0 +1,446 @@
+#!/usr/bin/python3
+""" Contraction hierarchy over the cost of the connections
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+from array import array
+from heapq import heappush, heappop
+import logging
+from os import path
+
+from routemap import RouteMap
+
+
+class ContractionHierarchy(object):
+    """ Cheapest routes between any two cities, from a contraction hierarchy.
+
+    The cities are contracted one after the other, from the least important.
+    When a city is removed, its neighbours get a shortcut edge wherever the
+    cheapest way between them went through it. Every edge then goes up from
+    the city contracted first to the one contracted later, and a cheapest
+    route always climbs from each end to a city where both searches meet, so
+    a query only searches upward from both cities. The connections can be
+    taken both ways for the same cost, so one upward graph serves both
+    searches.
+
+    Each original edge keeps the arc of its cheapest connection, and each
+    shortcut the two edges it replaces, through the city in the middle. The
+    route found is unpacked into the arcs of the map.
+
+    The hierarchy only uses the cost of the connections, so it can not
+    answer the clients with constraints on the connections.
+
+    Attributes:
+        WITNESS_LIMIT (int): Number of cities settled by each search for a
+            route which avoids the city being contracted. Stopping early
+            only adds some shortcuts which are not needed.
+        rank (array): Position of each city in the contraction order.
+        tail (array): City contracted first of each edge.
+        head (array): City contracted later of each edge.
+        weight (array): Cost of each edge.
+        arc (array): Arc from the tail to the head of each original edge, -1
+            for the shortcuts.
+        down (array): Edge between the middle city and the tail of each
+            shortcut.
+        up (array): Edge between the middle city and the head of each
+            shortcut.
+        first (array): First upward edge of each city, indexed by city.
+        edges (array): The upward edges, sorted by tail.
+    """
+
+    WITNESS_LIMIT = 64
+
+    def __init__(self, rank, tail, head, weight, arc, down, up):
+        """ Initialize a ContractionHierarchy from its edges.
+
+        Args:
+            rank (array): Position of each city in the contraction order.
+            tail (array): City contracted first of each edge.
+            head (array): City contracted later of each edge.
+            weight (array): Cost of each edge.
+            arc (array): Arc of each original edge, -1 for the shortcuts.
+            down (array): Edge to the tail of each shortcut.
+            up (array): Edge to the head of each shortcut.
+        """
+        self.rank = rank
+        self.tail = tail
+        self.head = head
+        self.weight = weight
+        self.arc = arc
+        self.down = down
+        self.up = up
+
+        self.first = array('i', [0]) * (len(rank) + 1)
+        for city in tail:
+            self.first[city + 1] += 1
+        for city in range(1, len(self.first)):
+            self.first[city] += self.first[city - 1]
+        self.edges = array('i', [0]) * len(tail)
+        position = self.first[:]
+        for edge, city in enumerate(tail):
+            self.edges[position[city]] = edge
+            position[city] += 1
+
+    @classmethod
+    def build(cls, route_map):
+        """ Contracts every city of a route map.
+
+        The next city contracted is the one which adds the fewest shortcuts
+        for the edges it removes, counting the neighbours already contracted
+        to spread the contraction over the map. The importance of a city is
+        only updated when it is about to be contracted.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+
+        Returns:
+            The new ContractionHierarchy.
+        """
+        size = len(route_map.offsets) - 1
+        tail, head, weight = array('i'), array('i'), array('q')
+        arc, down, up = array('i'), array('i'), array('i')
+
+        # Edge between each city and each of its neighbours left.
+        adjacent = [{} for _ in range(size)]
+        for city in range(size):
+            for a in route_map.arcs(city):
+                other = route_map.neighbour[a]
+                edge = adjacent[city].get(other)
+                if other == city or (edge is not None and
+                                     weight[edge] <= route_map.cost[a]):
+                    continue
+                if edge is None:
+                    edge = len(tail)
+                    tail.append(0)
+                    head.append(0)
+                    weight.append(0)
+                    arc.append(0)
+                    down.append(-1)
+                    up.append(-1)
+                tail[edge], head[edge] = city, other
+                weight[edge], arc[edge] = route_map.cost[a], a
+                adjacent[city][other] = adjacent[other][city] = edge
+
+        def shortcuts(city):
+            """ Shortcuts needed to contract a city.
+
+            Returns:
+                List with the two neighbours, the cost and the two edges of
+                each shortcut.
+            """
+            needed = []
+            neighbours = list(adjacent[city].items())
+            for i, (source, first) in enumerate(neighbours[:-1]):
+                targets = {target: weight[first] + weight[second]
+                           for target, second in neighbours[i + 1:]}
+                witness = cls.witness(adjacent, weight, source, city,
+                                      targets)
+                for target, second in neighbours[i + 1:]:
+                    cost = targets[target]
+                    if witness.get(target, cost + 1) > cost:
+                        needed.append((source, target, cost, first, second))
+            return needed
+
+        rank = array('i', [-1]) * size
+        contracted = [0] * size
+        heap = [(len(shortcuts(city)) - len(adjacent[city]), city)
+                for city in range(size)]
+        heap.sort()
+        order = 0
+        while heap:
+            _, city = heappop(heap)
+            needed = shortcuts(city)
+            importance = (len(needed) - len(adjacent[city]) +
+                          contracted[city])
+            if heap and importance > heap[0][0]:
+                heappush(heap, (importance, city))
+                continue
+
+            # An edge between two cities left is not part of any shortcut
+            # yet, so a cheaper shortcut takes its place.
+            for source, target, cost, first, second in needed:
+                edge = adjacent[source].get(target)
+                if edge is not None and weight[edge] <= cost:
+                    continue
+                if edge is None:
+                    edge = len(tail)
+                    tail.append(0)
+                    head.append(0)
+                    weight.append(0)
+                    arc.append(0)
+                    down.append(0)
+                    up.append(0)
+                tail[edge], head[edge], weight[edge] = source, target, cost
+                arc[edge], down[edge], up[edge] = -1, first, second
+                adjacent[source][target] = adjacent[target][source] = edge
+
+            # The edges left are the ones going up from the city.
+            for other, edge in adjacent[city].items():
+                if tail[edge] != city:
+                    tail[edge], head[edge] = city, other
+                    if arc[edge] >= 0:
+                        arc[edge] = route_map.twin(arc[edge])
+                    else:
+                        down[edge], up[edge] = up[edge], down[edge]
+                del adjacent[other][city]
+                contracted[other] += 1
+            adjacent[city] = {}
+            rank[city] = order
+            order += 1
+
+        return cls(rank, tail, head, weight, arc, down, up)
+
+    @staticmethod
+    def witness(adjacent, weight, source, avoided, targets):
+        """ Cheap routes from a city to some others which avoid another one.
+
+        The search stops when every target is settled, or when the routes
+        cost more than the shortcuts to the targets.
+
+        Args:
+            adjacent: Edge between each city and each of its neighbours left.
+            weight (array): Cost of each edge.
+            source (int): City the routes start from.
+            avoided (int): City the routes can not go through.
+            targets (dict): Cost of the shortcut to each target.
+
+        Returns:
+            Dictionary with the cost of a route found to some cities, the
+            cheapest one for the cities settled.
+        """
+        limit = max(targets.values())
+        left = len(targets)
+        cost = {source: 0}
+        heap = [(0, source)]
+        settled = 0
+        while heap and left and settled < ContractionHierarchy.WITNESS_LIMIT:
+            current, city = heappop(heap)
+            if current > cost[city]:
+                continue
+            settled += 1
+            if city in targets:
+                left -= 1
+            for other, edge in adjacent[city].items():
+                new = current + weight[edge]
+                if new <= limit and other != avoided and (
+                        other not in cost or new < cost[other]):
+                    cost[other] = new
+                    heappush(heap, (new, other))
+        return cost
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads a contraction hierarchy file.
+
+        The first line has the number of cities and of edges, the second the
+        rank of each city, followed by a line per edge with its tail, head,
+        cost, arc and the two edges of a shortcut, -1 for the original
+        edges.
+
+        Args:
+            filename (str): Filename of the contraction hierarchy file.
+
+        Returns:
+            The loaded ContractionHierarchy.
+        """
+        with open(filename, 'r') as ch_file:
+            _, count = [int(x) for x in ch_file.readline().split(" ")]
+            rank = array('i', [int(x) for x in ch_file.readline().split()])
+            columns = [array('i'), array('i'), array('q'), array('i'),
+                       array('i'), array('i')]
+            for _ in range(count):
+                for column, x in zip(columns, ch_file.readline().split(" ")):
+                    column.append(int(x))
+
+        return cls(rank, *columns)
+
+    @classmethod
+    def load_or_build(cls, route_map, map_filename, save):
+        """ Loads the contraction hierarchy saved next to the map file, or
+            builds it if there is none up to date.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            map_filename (str): Filename of the map file.
+            save (bool): Save the built hierarchy next to the map file.
+
+        Returns:
+            The ContractionHierarchy.
+        """
+        filename = map_filename[:map_filename.rfind('.')] + ".ch"
+        if (path.exists(filename) and
+            path.getmtime(filename) >= path.getmtime(map_filename)):
+            hierarchy = cls.load(filename)
+            if len(hierarchy.rank) == len(route_map.offsets) - 1:
+                return hierarchy
+
+        hierarchy = cls.build(route_map)
+        if save:
+            hierarchy.save(filename)
+        return hierarchy
+
+    def save(self, filename):
+        """ Writes the contraction hierarchy to a file in the format read by
+            load.
+
+        Args:
+            filename (str): Filename of the contraction hierarchy file.
+        """
+        with open(filename, 'w') as ch_file:
+            ch_file.write("{} {}\n".format(len(self.rank), len(self.tail)))
+            ch_file.write(" ".join(str(x) for x in self.rank) + "\n")
+            for edge in zip(self.tail, self.head, self.weight, self.arc,
+                            self.down, self.up):
+                ch_file.write("{} {} {} {} {} {}\n".format(*edge))
+
+    def path(self, route_map, origin, goal):
+        """ Cheapest route between two cities.
+
+        Args:
+            route_map (RouteMap): RouteMap object the hierarchy was built for.
+            origin (int): Departure city.
+            goal (int): Destination city.
+
+        Returns:
+            List with the arcs of the route, in order, or None if the goal
+            can not be reached.
+        """
+        if not (0 <= origin < len(self.rank) and 0 <= goal < len(self.rank)):
+            return [] if origin == goal else None
+
+        first, edges = self.first, self.edges
+        head, weight = self.head, self.weight
+
+        # Cost, edge and previous city of the cities reached by each side.
+        reached = ({origin: (0, -1, -1)}, {goal: (0, -1, -1)})
+        open_lists = ([(0, origin)], [(0, goal)])
+        best, meeting = float("inf"), None
+
+        while True:
+            # The side with the cheapest open city, while it is cheaper than
+            # the best route found.
+            side = None
+            for i in (0, 1):
+                if (open_lists[i] and open_lists[i][0][0] < best and
+                    (side is None or
+                     open_lists[i][0][0] < open_lists[side][0][0])):
+                    side = i
+            if side is None:
+                break
+
+            cost, city = heappop(open_lists[side])
+            this, other = reached[side], reached[1 - side]
+            if cost > this[city][0]:
+                continue
+            if city in other and cost + other[city][0] < best:
+                best, meeting = cost + other[city][0], city
+
+            # A city reached cheaper from above is not on a route climbing
+            # to the meeting city, so it is stalled.
+            span = range(first[city], first[city + 1])
+            if any(head[edges[i]] in this and
+                   this[head[edges[i]]][0] + weight[edges[i]] < cost
+                   for i in span):
+                continue
+
+            for i in span:
+                edge = edges[i]
+                new_city = head[edge]
+                new_cost = cost + weight[edge]
+                known = this.get(new_city)
+                if known is None or new_cost < known[0]:
+                    this[new_city] = (new_cost, edge, city)
+                    heappush(open_lists[side], (new_cost, new_city))
+
+        if meeting is None:
+            return None
+
+        # Edges from the origin up to the meeting city, and down to the goal,
+        # with the city each one is taken from.
+        steps = []
+        city = meeting
+        while city != origin:
+            _, edge, city = reached[0][city]
+            steps.append((edge, city))
+        steps.reverse()
+        city = meeting
+        while city != goal:
+            _, edge, previous = reached[1][city]
+            steps.append((edge, city))
+            city = previous
+
+        # Shortcuts over connections without cost may go through a city
+        # more than once, and the loops are cut out of the route.
+        arcs = []
+        cities = [origin]
+        position = {origin: 0}
+        for edge, city in steps:
+            for arc in self.unpack(route_map, edge, city):
+                city = route_map.neighbour[arc]
+                if city in position:
+                    for repeated in cities[position[city] + 1:]:
+                        del position[repeated]
+                    del cities[position[city] + 1:]
+                    del arcs[position[city]:]
+                else:
+                    position[city] = len(cities)
+                    cities.append(city)
+                    arcs.append(arc)
+        return arcs
+
+    def unpack(self, route_map, edge, origin):
+        """ Arcs of the route an edge stands for.
+
+        Args:
+            route_map (RouteMap): RouteMap object the hierarchy was built for.
+            edge (int): Number of the edge.
+            origin (int): End of the edge the route starts from.
+
+        Returns:
+            List with the arcs of the route, in order.
+        """
+        arcs = []
+        stack = [(edge, origin)]
+        while stack:
+            edge, origin = stack.pop()
+            if self.arc[edge] >= 0:
+                arcs.append(self.arc[edge] if self.tail[edge] == origin
+                            else route_map.twin(self.arc[edge]))
+                continue
+            # The middle city is the tail of both edges of a shortcut.
+            middle = self.tail[self.down[edge]]
+            if self.tail[edge] == origin:
+                stack.append((self.up[edge], middle))
+                stack.append((self.down[edge], origin))
+            else:
+                stack.append((self.down[edge], middle))
+                stack.append((self.up[edge], origin))
+        return arcs
+
+
+def main():
+    """ Builds the contraction hierarchy of a map and saves it next to the
+        map file.
+    """
+
+    parser = ArgumentParser(description="Build the contraction hierarchy of \
+                                a map",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemap",
+                        help="file where the map is defined")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.INFO)
+
+    route_map = RouteMap(args.routemap)
+    logging.info("Contracting {} cities".format(len(route_map.cities)))
+    hierarchy = ContractionHierarchy.build(route_map)
+    filename = args.routemap[:args.routemap.rfind('.')] + ".ch"
+    hierarchy.save(filename)
+    logging.info("Saved {} edges to {}".format(len(hierarchy.tail), filename))
+
+if __name__ == '__main__':
+    main()
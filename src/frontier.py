@@ -0,0 +1,189 @@
+""" Open list backends
+"""
+
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+
+
+class Frontier(object):
+    """ Base class for the open list backends.
+
+    A frontier stores the numbers of the currently open nodes and hands them
+    back according to its ordering. Opening a node which is already open only
+    updates its priority.
+    """
+
+    def push(self, number, priority=0):
+        """ Opens a node.
+
+        Args:
+            number (int): Number of the node to open.
+            priority: Priority of the node, lower comes out first.
+        """
+        pass
+
+    def pop(self):
+        """ Removes the next node from the frontier.
+
+        Returns:
+            The number of the removed node.
+        """
+        pass
+
+    def __contains__(self, number):
+        return number in self.open
+
+    def __len__(self):
+        return len(self.open)
+
+
+class FifoFrontier(Frontier):
+    """ First in, first out frontier.
+
+    Attributes:
+        queue (deque): Open nodes in the order they were opened.
+        open (set): Numbers of the open nodes.
+    """
+
+    def __init__(self):
+        self.queue = deque()
+        self.open = set()
+
+    def push(self, number, priority=0):
+        if number not in self.open:
+            self.open.add(number)
+            self.queue.append(number)
+
+    def pop(self):
+        number = self.queue.popleft()
+        self.open.remove(number)
+        return number
+
+
+class LifoFrontier(Frontier):
+    """ Last in, first out frontier.
+
+    Attributes:
+        stack (list): Open nodes in the order they were opened.
+        open (set): Numbers of the open nodes.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.open = set()
+
+    def push(self, number, priority=0):
+        if number not in self.open:
+            self.open.add(number)
+            self.stack.append(number)
+
+    def pop(self):
+        number = self.stack.pop()
+        self.open.remove(number)
+        return number
+
+
+class HeapFrontier(Frontier):
+    """ Binary heap with lazy deletion.
+
+    Improving an open node pushes a new entry instead of searching the old
+    one, the stale entries are discarded when they reach the top of the heap.
+    Nodes with the same priority come out in the reverse order they were
+    opened.
+
+    Attributes:
+        heap (list): Heap of (priority, -order, number) entries.
+        open (dict): Current (priority, -order) of each open node.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.open = {}
+        self.order = count()
+
+    def push(self, number, priority=0):
+        if number in self.open:
+            key = (priority, self.open[number][1])
+            if key == self.open[number]:
+                return
+        else:
+            key = (priority, -next(self.order))
+
+        self.open[number] = key
+        heappush(self.heap, key + (number,))
+
+    def pop(self):
+        while True:
+            priority, order, number = heappop(self.heap)
+            if self.open.get(number) == (priority, order):
+                del self.open[number]
+                return number
+
+
+class BucketFrontier(Frontier):
+    """ Dial's bucket queue for integer priorities.
+
+    Keeps a circular array of buckets, one per priority value, starting at
+    the lowest priority that can still come out. The array grows when a
+    priority falls beyond its end. Priorities pushed must never be lower than
+    the last one popped, which holds for non negative edge weights. Nodes with
+    the same priority come out in the reverse order they were pushed.
+
+    Attributes:
+        buckets (list): Circular array of lists of (priority, number) entries.
+        cursor (int): Priority of the bucket currently being emptied.
+        open (dict): Current priority of each open node.
+    """
+
+    def __init__(self, size=64):
+        self.buckets = [[] for _ in range(size)]
+        self.cursor = None
+        self.open = {}
+
+    def push(self, number, priority=0):
+        if self.open.get(number) == priority:
+            return
+
+        if self.cursor is None:
+            self.cursor = priority
+        elif priority < self.cursor:
+            raise ValueError("priority {} is lower than the last popped {}"
+                             .format(priority, self.cursor))
+
+        if priority - self.cursor >= len(self.buckets):
+            self.__grow(priority - self.cursor + 1)
+
+        self.open[number] = priority
+        self.buckets[priority % len(self.buckets)].append((priority, number))
+
+    def pop(self):
+        if not self.open:
+            raise IndexError("pop from an empty frontier")
+
+        while True:
+            bucket = self.buckets[self.cursor % len(self.buckets)]
+            while bucket:
+                priority, number = bucket.pop()
+                if self.open.get(number) == priority:
+                    del self.open[number]
+                    return number
+            self.cursor += 1
+
+    def __grow(self, needed):
+        """ Resizes the circular array so that it spans at least the needed
+            number of priorities.
+
+        Args:
+            needed (int): Minimum number of buckets.
+        """
+        size = len(self.buckets)
+        while size < needed:
+            size *= 2
+
+        buckets = [[] for _ in range(size)]
+        for bucket in self.buckets:
+            for priority, number in bucket:
+                if self.open.get(number) == priority:
+                    buckets[priority % size].append((priority, number))
+        self.buckets = buckets
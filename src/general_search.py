@@ -8,9 +8,14 @@ class GeneralSearch(object):
     Base class for all the other search algorithms.
     The other search algorithm classes inherit from this one.
 
+    The nodes are referred to by their number. A candidate node is given to
+    the hooks as its number followed by the values it would be stored with,
+    and is only stored in the route when it is opened.
+
     Attributes:
-        route (dict): Dictionary with the nodes that compose the current route.
-        open_list (list): List where the currently open nodes are stored
+        route: The tree with the nodes that compose the current route.
+        open_list (Frontier): Frontier where the currently open nodes are
+            stored
     """
 
     def __init__(self):
@@ -28,7 +33,15 @@ class GeneralSearch(object):
         """ Initialize the discovered route and the open list
         """
         self.route = {}
-        self.open_list = []
+        self.open_list = self.new_open_list()
+
+    def new_open_list(self):
+        """ Creates the frontier where the open nodes are stored.
+
+        Returns:
+            An empty Frontier, which sets the order the nodes are selected in.
+        """
+        pass
 
     def loop(self):
         """ Main algorithm loop.
@@ -47,7 +60,7 @@ class GeneralSearch(object):
             Boolean with the result of the test.
         """
 
-        return self.open_list == []
+        return not self.open_list
 
     def select(self):
         """ Get the next node in the open list according to the selection
@@ -65,47 +78,47 @@ class GeneralSearch(object):
             number (int): Number of the node to expand.
         """
 
-        node = self.route[number]
-
-        valid_connections = self.get_valid_connections(node)
+        valid_connections = self.get_valid_connections(number)
 
         if not valid_connections:
             return
 
         for connection in valid_connections:
-            new_node = self.open_edge(node, connection)
+            candidate = self.open_edge(number, connection)
 
-            if self.check_node(new_node):
-                self.open_node(new_node)
+            if self.check_node(*candidate):
+                self.open_node(*candidate)
 
-    def open_edge(self, node, connection):
-        """ Create a new node object given a node and one of it's edges.
+    def open_edge(self, number, connection):
+        """ Creates the candidate node reached through one of the edges of a
+            node.
 
         Args:
-            node: The node to which the connection departs from.
+            number (int): Number of the node the connection departs from.
             connection: The given connection.
 
         Returns:
-            The new node ready to be inserted in the route map.
+            Tuple with the number of the new node followed by its values.
         """
         pass
 
-    def get_valid_connections(self, node):
+    def get_valid_connections(self, number):
         """ Get a list of all the valid connections for a specific node.
 
         Args:
-            node: The node from which the connections depart.
+            number (int): Number of the node the connections depart from.
 
         Returns:
             The connections of the node which are valid.
         """
         pass
 
-    def check_node(self, new_node):
+    def check_node(self, number, *candidate):
         """ Check if a node is worth opening.
 
         Args:
-            new_node (Node): Node to check.
+            number (int): Number of the candidate node.
+            *candidate: Values of the candidate node.
 
         Returns:
             True if the node is worth opening.
@@ -113,11 +126,50 @@ class GeneralSearch(object):
         """
         pass
 
-    def open_node(self, new_node):
-        """ Add a newly open node to the open list.
+    def open_node(self, number, *candidate):
+        """ Stores a candidate node in the route and adds it to the open list.
+
+        Args:
+            number (int): Number of the node to open.
+            *candidate: Values of the node.
+        """
+        pass
+
+    def insert_open(self, number):
+        """ Inserts a node in the open list, unless it is already there.
+
+        Args:
+            number (int): Number of the node to insert.
+        """
+        self.open_list.push(number)
+
+    def is_goal(self, number):
+        """ Goal test.
+
+        Args:
+            number (int): Number of the node to test.
+
+        Returns:
+            True if the node is the goal of the search.
+        """
+        pass
+
+    def goal_count(self):
+        """ Number of goals of the search.
+
+        Returns:
+            How many different nodes pass the goal test.
+        """
+        return 1
+
+    def evaluate(self, number):
+        """ Evaluation function used to order the open nodes.
 
         Args:
-            new_node(Node): The node to open
+            number (int): Number of the node to evaluate.
+
+        Returns:
+            The priority of the node, lower values are selected first.
         """
         pass
 
@@ -133,10 +185,3 @@ class GeneralSearch(object):
         """
         pass
 
-
-class Node(object):
-    """ A node on the discovered route tree
-    """
-
-    def __init__(self):
-        pass
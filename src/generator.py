@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+""" Synthetic map and client generator
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import random
+
+from routemap import Connection
+
+TRANSPORTS = ["aviao", "barco", "comboio", "autocarro"]
+
+
+def generate_map(map_file, cities, density, periods, rng):
+    """ Writes a random map.
+
+    Every city gets at least one connection, so that few of them are
+    isolated, and the others link random pairs of cities.
+
+    Args:
+        map_file (file): File object where the map is written.
+        cities (int): Number of cities.
+        density (float): Average number of connections per city.
+        periods: The periods the connections are drawn from.
+        rng (Random): Source of the random numbers.
+    """
+    connections = max(cities - 1, int(cities * density))
+    map_file.write("{} {}\n".format(cities, connections))
+
+    for i in range(connections):
+        if i < cities - 1:
+            # Links each city to one of the previous ones.
+            a, b = i + 2, rng.randint(1, i + 1)
+        else:
+            a, b = rng.randint(1, cities), rng.randint(1, cities)
+        ti = rng.randrange(Connection.DAY // 2)
+        tf = rng.randrange(ti, Connection.DAY)
+        map_file.write("{} {} {} {} {} {} {} {}\n".format(
+            a, b, rng.choice(TRANSPORTS), rng.randint(10, 600),
+            rng.randint(1, 100), ti, tf, rng.choice(periods)))
+
+
+def generate_clients(cli_file, cities, clients, custo, constrained, rng):
+    """ Writes random clients' requests.
+
+    Args:
+        cli_file (file): File object where the clients are written.
+        cities (int): Number of cities of the map.
+        clients (int): Number of clients.
+        custo (float): Fraction of the clients that optimize the cost.
+        constrained (float): Fraction of the clients with constraints.
+        rng (Random): Source of the random numbers.
+    """
+    constraints = {
+        "A1": lambda: rng.choice(TRANSPORTS),
+        "A2": lambda: rng.randint(100, 600),
+        "A3": lambda: rng.randint(20, 100),
+        "B1": lambda: rng.randint(5, 30) * Connection.DAY,
+        "B2": lambda: rng.randint(50, 500),
+    }
+
+    cli_file.write("{}\n".format(clients))
+    for number in range(1, clients + 1):
+        chosen = []
+        if rng.random() < constrained:
+            chosen = rng.sample(sorted(constraints), rng.randint(1, 2))
+        cli_file.write("{} {} {} {} {} {}{}\n".format(
+            number, rng.randint(1, cities), rng.randint(1, cities),
+            rng.randrange(3 * Connection.DAY),
+            "custo" if rng.random() < custo else "tempo", len(chosen),
+            "".join(" {} {}".format(c, constraints[c]()) for c in chosen)))
+
+
+def main():
+    """ Generates a map file and a client file with the same seed.
+    """
+
+    parser = ArgumentParser(description="Generate a synthetic map and \
+                                clients",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("prefix",
+                        help="name of the files, without the .map and .cli \
+                            extensions")
+    parser.add_argument("-c", "--cities",
+                        help="number of cities",
+                        type=int,
+                        default=1000)
+    parser.add_argument("-d", "--density",
+                        help="average number of connections per city",
+                        type=float,
+                        default=4)
+    parser.add_argument("-p", "--periods",
+                        help="comma separated periods the connections are \
+                            drawn from",
+                        default="30,60,120,240,720,1440")
+    parser.add_argument("-n", "--clients",
+                        help="number of clients",
+                        type=int,
+                        default=1000)
+    parser.add_argument("--custo",
+                        help="fraction of the clients that optimize the cost",
+                        type=float,
+                        default=0.5)
+    parser.add_argument("--constrained",
+                        help="fraction of the clients with constraints",
+                        type=float,
+                        default=0.3)
+    parser.add_argument("-s", "--seed",
+                        help="seed of the random numbers",
+                        type=int,
+                        default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    periods = [int(x) for x in args.periods.split(",")]
+    with open(args.prefix + ".map", 'w') as map_file:
+        generate_map(map_file, args.cities, args.density, periods, rng)
+    with open(args.prefix + ".cli", 'w') as cli_file:
+        generate_clients(cli_file, args.cities, args.clients, args.custo,
+                         args.constrained, rng)
+
+if __name__ == '__main__':
+    main()
@@ -2,20 +2,48 @@
 """
 
 from general_search import GeneralSearch
+from uninformed_search import UniformCostSearch
 
 
 class GreedyBestFirstSearch(GeneralSearch):
     """ Greedy Best First Search
 
-    Inherits from GeneralSearch class.
+    Inherits from GeneralSearch class. The open nodes are kept in a priority
+    queue, the backend is given by the queue attribute.
     """
 
+    def new_open_list(self):
+        """ Creates the priority queue that holds the open nodes. """
+        return self.queue()
+
+    def insert_open(self, number):
+        """ Inserts or updates a node in the priority queue. """
+        self.open_list.push(number, self.evaluate(number))
+
     def select(self):
         """ Returns the opened node with the lowest cost. """
-        if self.client.optimization == "custo":
-            self.open_list.sort(key=lambda x: self.route[x].cost_so_far,
-                                reverse=True)
-        else:
-            self.open_list.sort(key=lambda x: self.route[x].time_so_far,
-                                reverse=True)
         return self.open_list.pop()
+
+
+class AStarSearch(UniformCostSearch):
+    """ A* Search
+
+    Inherits from UniformCostSearch class. The open nodes are ordered by their
+    evaluation plus the heuristic estimate of the remaining distance. With a
+    consistent heuristic each node is still settled at most once.
+    """
+
+    def evaluate(self, number):
+        """ Adds the heuristic estimate to the evaluation of the node. """
+        return super().evaluate(number) + self.heuristic(number)
+
+    def heuristic(self, number):
+        """ Estimate of the remaining distance from a node to the goal.
+
+        Args:
+            number (int): Number of the node to estimate.
+
+        Returns:
+            A lower bound of the remaining distance.
+        """
+        pass
@@ -0,0 +1,205 @@
+""" Search instrumentation
+"""
+
+import csv
+from functools import lru_cache
+import json
+from time import perf_counter
+
+# Counters kept for each search, in the order of the sidecar columns.
+COUNTERS = ["expanded", "generated", "opened", "reopened", "rejected",
+            "peak_open", "next_trip_seconds", "seconds"]
+
+# Ways of answering a client which do not go through the hooks of
+# GeneralSearch, so only their time is known.
+UNHOOKED = ("scan", "bidirectional", "contraction")
+
+# Counters of the searches finished in this process and not drained yet.
+_records = []
+
+
+class InstrumentedSearch(object):
+    """ Counts what a search does through the hooks of GeneralSearch.
+
+    It is only put in front of a search class by instrument, so the searches
+    which are not instrumented do not pay for the counting at all.
+
+    The path which answered the client is kept with the counters:
+        search: The hooks of GeneralSearch.
+        labels: The hooks of the ISTravelPareto search delegated to.
+        scan: The timetable scan of ISTravelCSA.
+        bidirectional: The bidirectional search of ISTravelSearch.
+        contraction: The contraction hierarchy of the route map.
+    Only the time of the last three is counted, their other counters are
+    None.
+
+    The counters of a search are:
+        expanded: Nodes expanded.
+        generated: Candidates given to check_node.
+        opened: Candidates which passed check_node.
+        reopened: Candidates opened for a city reached before in the search.
+        rejected: Arcs dropped by the constraints of the client.
+        peak_open: Largest size of the open list.
+        next_trip_seconds: Time spent looking for the next trips.
+        seconds: Time spent in the whole search.
+
+    Attributes:
+        stats (dict): Counters of the last search.
+    """
+
+    def calculate(self):
+        """ Runs the search, counting what it does.
+        """
+        self.stats = dict.fromkeys(COUNTERS, 0)
+        self.stats["path"] = "search"
+        self.reached = set()
+        start = perf_counter()
+        super().calculate()
+        if self.stats["path"] in UNHOOKED:
+            self.stats.update(dict.fromkeys(COUNTERS))
+        self.stats["seconds"] = perf_counter() - start
+        del self.reached
+
+    def delegate(self, algorithm):
+        super().delegate(instrument(algorithm))
+        self.stats.update(self.delegated.stats)
+        self.stats["path"] = "labels"
+
+    def scan(self):
+        self.stats["path"] = "scan"
+        super().scan()
+
+    def bidirectional(self):
+        self.stats["path"] = "bidirectional"
+        return super().bidirectional()
+
+    def contracted(self):
+        self.stats["path"] = "contraction"
+        return super().contracted()
+
+    def expand_node(self, number):
+        self.stats["expanded"] += 1
+        super().expand_node(number)
+
+    def get_valid_connections(self, number, *args):
+        arcs = super().get_valid_connections(number, *args)
+        self.stats["rejected"] += (len(self.route_map.arcs(number)) -
+                                   len(arcs))
+        return arcs
+
+    def next_trip_times(self, time, arcs):
+        start = perf_counter()
+        departures = super().next_trip_times(time, arcs)
+        self.stats["next_trip_seconds"] += perf_counter() - start
+        return departures
+
+    def check_node(self, number, *candidate):
+        self.stats["generated"] += 1
+        return super().check_node(number, *candidate)
+
+    def open_node(self, number, *candidate):
+        self.stats["opened"] += 1
+        if number in self.reached:
+            self.stats["reopened"] += 1
+        else:
+            self.reached.add(number)
+        super().open_node(number, *candidate)
+
+    def insert_open(self, number):
+        super().insert_open(number)
+        if len(self.open_list) > self.stats["peak_open"]:
+            self.stats["peak_open"] = len(self.open_list)
+
+
+@lru_cache(maxsize=None)
+def instrument(algorithm):
+    """ Creates the instrumented version of a search class.
+
+    Args:
+        algorithm: Class of the search.
+
+    Returns:
+        Subclass of the search which counts what it does.
+    """
+    return type("Instrumented" + algorithm.__name__,
+                (InstrumentedSearch, algorithm), {})
+
+
+def record(alg, numbers):
+    """ Keeps the counters of a finished search, if it was instrumented.
+
+    Args:
+        alg (GeneralSearch): The search.
+        numbers: Numbers of the clients routed by the search.
+    """
+    stats = getattr(alg, "stats", None)
+    if stats is not None:
+        _records.append((list(numbers), stats))
+
+
+def drain():
+    """ Takes the counters kept so far.
+
+    Returns:
+        List with the client numbers and the counters of each search.
+    """
+    records = _records[:]
+    del _records[:]
+    return records
+
+
+def keep(records):
+    """ Keeps counters drained in another process.
+
+    Args:
+        records: List with the client numbers and the counters of each
+            search.
+    """
+    _records.extend(records)
+
+
+class StatsWriter(object):
+    """ Writes the counters of the searches next to the solution file.
+
+    Each client gets a row, with the path and the counters of the search
+    that routed it. The clients of a group share the same row values, and
+    the clients answered without searching get none. The counters which are
+    not known for the path are left empty.
+
+    Attributes:
+        FORMATS: The file formats, with the extension of each.
+        stats_file (file): File object where the rows are written.
+        writer: Writes a row in the file.
+    """
+
+    FORMATS = {"csv": ".stats.csv", "json": ".stats.jsonl"}
+
+    def __init__(self, stats_file, fmt):
+        """ Initialize a StatsWriter.
+
+        Args:
+            stats_file (file): File object where the rows are written.
+            fmt (str): One of FORMATS.
+        """
+        self.stats_file = stats_file
+        if fmt == "csv":
+            writer = csv.writer(stats_file)
+            writer.writerow(["client", "group", "path"] + COUNTERS)
+            self.writer = lambda row: writer.writerow(
+                [row["client"], row["group"], row["path"]] +
+                [row[name] for name in COUNTERS])
+        else:
+            self.writer = lambda row: stats_file.write(json.dumps(row) + "\n")
+
+    def write(self, records):
+        """ Writes a row for each client of some searches.
+
+        Args:
+            records: List with the client numbers and the counters of each
+                search.
+        """
+        for numbers, stats in records:
+            for number in numbers:
+                row = {"client": number, "group": len(numbers)}
+                row.update(stats)
+                self.writer(row)
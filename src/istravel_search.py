@@ -1,11 +1,21 @@
 """ Problem specific classes
 """
 
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+
 from uninformed_search import *
 from informed_search import *
 from general_search import *
 
 from client import Client
+from constraints import CompiledConstraints, ConstTotalCost, ConstTotalTime
+from routemap import Connection, next_trip_time
+from frontier import HeapFrontier
+from landmarks import LandmarkTable
+from timetable import Timetable
+from route_tree import RouteTree
 
 
 class ISTravelSearch(GeneralSearch):
@@ -18,186 +28,669 @@ class ISTravelSearch(GeneralSearch):
     Attributes:
         route_map (RouteMap): RouteMap object.
         client (Client): Client object.
+        constraints (CompiledConstraints): The client's constraints compiled
+            for the route map.
         sec_optim (bool): Whether or not to optimize the second parameter in
             case there are two routes with the same cost
-        route (dict): Dictionary with the nodes that compose the current route.
-        open_list (list): List where the currently open nodes are stored
+        goals (set): Destinations searched for at once, by default only the
+            client's goal. They share the client's departure and constraints.
+        queue: Frontier class used by the algorithms that keep the open nodes
+            in a priority queue.
+        route (RouteTree): Tree with the nodes that compose the current route.
+        open_list (Frontier): Frontier where the currently open nodes are
+            stored
+        delegated (ISTravelSearch): The search which routed the client
+            instead, if any.
     """
 
-    def __init__(self, route_map, client, sec_optim):
+    # Whether the algorithm can search for several goals at once.
+    MULTI_GOAL = False
+    # Whether the algorithm always finds the best route of the optimized
+    # parameter, so its answers can be replaced by precomputed ones.
+    EXACT = False
+    # Whether the clients for which only the cost of the connections matters
+    # are searched from both ends instead, see bidirectional.
+    BIDIRECTIONAL = False
+    # Whether the algorithm keeps a single route to each city, so that the
+    # clients whose best route it can miss are searched by ISTravelPareto
+    # instead, see bounded.
+    SINGLE_ROUTE = False
+
+    def __init__(self, route_map, client, sec_optim, queue=HeapFrontier,
+                 goals=None):
         """ Initialize a GeneralSearch object.
 
         Args:
             route_map (RouteMap): RouteMap object.
             client (Client): Client object.
             sec_optim (bool): Optimize secondary weight.
+            queue: Priority queue backend.
+            goals (set): Destinations to search for, only for the algorithms
+                with MULTI_GOAL.
         """
         self.route_map = route_map
         self.client = client
+        self.constraints = CompiledConstraints(client.constraints, route_map)
         self.sec_optim = sec_optim
+        self.queue = queue
+        self.goals = goals or {client.goal}
+        self.delegated = None
 
-        self.route = {}
-        self.open_list = []
-        # Opens initial node.
-        self.open_node(ISTravelNode(None, self.client.initial, None, 0, client.ti))
+    def calculate(self):
+        """ Runs the search, from both ends when the client allows it.
+
+        The route map's contraction hierarchy answers these clients instead,
+        when it is loaded and they have no constraints on the connections.
+        The algorithms with SINGLE_ROUTE leave the clients with other
+        constraints on the whole route to ISTravelPareto.
+        """
+        if self.BIDIRECTIONAL and self.static_cost():
+            if (self.route_map.contraction is not None and
+                    self.constraints.adjacency is None):
+                self.follow(self.contracted())
+            else:
+                self.follow(self.bidirectional())
+        elif self.SINGLE_ROUTE and not self.bounded():
+            self.delegate(ISTravelPareto)
+        else:
+            super().calculate()
+
+    def bounded(self):
+        """ Tests if the best route to each city is enough to find the best
+            route to the goals.
+
+        A route which is worse in the optimized parameter can still be the
+        only one that keeps within a total time or cost constraint on the
+        other parameter. The best route is always the one most within a
+        constraint on the optimized parameter, since leaving later never
+        makes the arrival earlier. The same goes for the secondary
+        optimization of "tempo": a later but cheaper arrival at a city can
+        still catch the same trips.
+
+        Returns:
+            True if every constraint on the whole route limits the optimized
+            parameter, and the cost is not optimized after the time.
+        """
+        if self.sec_optim and self.client.optimization == "tempo":
+            return False
+        limited = (ConstTotalTime if self.client.optimization == "tempo"
+                   else ConstTotalCost)
+        return all(isinstance(c, limited) for c in self.constraints.dynamic)
+
+    def delegate(self, algorithm):
+        """ Routes the client with another algorithm, whose route is then
+            the route of this search.
+
+        Args:
+            algorithm: Class of the search, which can search for the same
+                goals.
+        """
+        self.delegated = algorithm(self.route_map, self.client,
+                                   self.sec_optim, self.queue, self.goals)
+        self.delegated.calculate()
+
+    def static_cost(self):
+        """ Tests if the best route only depends on the cost of the
+            connections, and not on their times.
+
+        Returns:
+            True for the "custo" clients with a single goal, without
+            secondary optimization nor constraint on the total time.
+        """
+        return (self.client.optimization == "custo" and
+                not self.sec_optim and
+                self.goal_count() == 1 and
+                not any(isinstance(c, ConstTotalTime)
+                        for c in self.constraints.dynamic))
+
+    def contracted(self):
+        """ Queries the contraction hierarchy of the route map.
+
+        Returns:
+            List with the arcs of the cheapest route, in order, or None if
+            the goal can not be reached.
+        """
+        return self.route_map.contraction.path(self.route_map,
+                                               self.client.initial,
+                                               self.client.goal)
+
+    def bidirectional(self):
+        """ Bidirectional Dijkstra over the cost of the connections.
+
+        Every connection can be taken both ways for the same cost, so the
+        side of the goal searches the same arcs, filtered by the same static
+        constraints, as the side of the initial node. The side with the
+        cheapest open city is expanded, until the cheapest open cities of
+        both sides cost as much as the best route through a city reached by
+        both.
+
+        Returns:
+            List with the arcs of the cheapest route, in order, or None if
+            the goal can not be reached.
+        """
+
+        route_map = self.route_map
+        neighbour = route_map.neighbour
+        arc_cost = route_map.cost
+        adjacency = self.constraints.adjacency
+        arcs = route_map.arcs if adjacency is None else adjacency.__getitem__
+        initial = self.client.initial
+        goal = self.client.goal
+
+        # Cost, arc and parent of the cities reached by each side.
+        reached = ({initial: (0, -1, RouteTree.ROOT)},
+                   {goal: (0, -1, RouteTree.ROOT)})
+        # A goal which is not in the map is never reached.
+        open_lists = ([(0, initial)],
+                      [(0, goal)] if goal < len(route_map.offsets) - 1 else [])
+        closed = (set(), set())
+        best, meeting = (0, goal) if initial == goal else (float("inf"), None)
+
+        while (open_lists[0] and open_lists[1] and
+               open_lists[0][0][0] + open_lists[1][0][0] < best):
+            side = 0 if open_lists[0][0][0] <= open_lists[1][0][0] else 1
+            cost, number = heappop(open_lists[side])
+            if number in closed[side]:
+                continue
+            closed[side].add(number)
+
+            this, other = reached[side], reached[1 - side]
+            for arc in arcs(number):
+                new_number = neighbour[arc]
+                new_cost = cost + arc_cost[arc]
+                known = this.get(new_number)
+                if known is not None and known[0] <= new_cost:
+                    continue
+                this[new_number] = (new_cost, arc, number)
+                heappush(open_lists[side], (new_cost, new_number))
+                if new_number in other:
+                    total = new_cost + other[new_number][0]
+                    if total < best:
+                        best, meeting = total, new_number
+
+        if meeting is None:
+            return None
+
+        # Arcs from the initial node to the meeting city, and on to the goal.
+        path = []
+        number = meeting
+        while number != initial:
+            _, arc, number = reached[0][number]
+            path.append(arc)
+        path.reverse()
+        number = meeting
+        while number != goal:
+            _, arc, number = reached[1][number]
+            path.append(route_map.twin(arc))
+        return path
+
+    def follow(self, path):
+        """ Stores a route found without searching in the route tree.
+
+        Its times are found by taking its trips from the client's departure,
+        and the constraints on the whole route are checked along it.
+
+        Args:
+            path: List with the arcs of the route, in order, or None if the
+                goal can not be reached.
+        """
+
+        route_map = self.route_map
+        self.route = route_map.search_tree()
+        self.route.add(self.client.initial, RouteTree.ROOT, -1, 0,
+                       self.client.ti)
+        if path is None:
+            return
+
+        number, cost, time = self.client.initial, 0, self.client.ti
+        for arc in path:
+            connection = route_map.connection(arc)
+            if not all(constraint.check_connection(connection, cost, time)
+                       for constraint in self.constraints.dynamic):
+                return
+            departure = next_trip_time(time,
+                                       route_map.ti[arc],
+                                       route_map.last[arc],
+                                       route_map.period[arc])
+            cost += route_map.cost[arc]
+            time = departure + route_map.duration[arc]
+            self.route.add(route_map.neighbour[arc], number, arc, cost, time)
+            number = route_map.neighbour[arc]
 
     def initialize(self):
-        """ Initialize the node list and route.
+        """ Initialize the open list and the route tree with the initial node.
         """
-        super()
+        super().initialize()
+        self.route = self.route_map.search_tree()
         # Opens initial node.
-        self.open_node(ISTravelNode(None,
-                                    self.client.initial,
-                                    None,
-                                    0,
-                                    self.client.ti))
+        self.open_node(self.client.initial,
+                       RouteTree.ROOT,
+                       -1,
+                       0,
+                       self.client.ti)
 
-    def open_edge(self, node, connection):
-        """ Create a new node object given a node and one of it's edges.
+    def expand_node(self, number):
+        """ Expands a node.
 
         Args:
-            node: The node to which the connection departs from.
-            connection: The given connection.
+            number (int): Number of the node to expand.
+        """
+        self.expand(number,
+                    self.route.cost[number],
+                    self.route.time[number],
+                    number)
 
-        Returns:
-            The new node ready to be inserted in the route map.
+    def expand(self, number, cost, time, parent):
+        """ Opens the nodes reached through the valid arcs of a node.
+
+        The departure times of all the arcs are calculated at once, and each
+        candidate is checked from its values before anything is stored.
+
+        Args:
+            number (int): Number of the city of the node.
+            cost (int): Cost of the route to the node.
+            time (int): Absolute time of arrival at the node.
+            parent (int): Parent given to the opened nodes.
         """
-        adjacent = connection.get_adjacent(node.number)
+        route_map = self.route_map
+        arcs = self.get_valid_connections(number, cost, time)
+        departures = self.next_trip_times(time, arcs)
+
+        for arc, departure in zip(arcs, departures):
+            new_number = route_map.neighbour[arc]
+            new_cost = cost + route_map.cost[arc]
+            new_time = departure + route_map.duration[arc]
 
-        new_node = ISTravelNode(
-            node,
-            adjacent,
-            connection,
-            node.cost_so_far + connection.cost,
-            connection.next_trip_time(node.time_so_far)
-            + connection.duration
-        )
+            if self.check_node(new_number, new_cost, new_time):
+                self.open_node(new_number, parent, arc, new_cost, new_time)
 
-        return new_node
+    def next_trip_times(self, time, arcs):
+        """ Calculates the time of the next trip of several arcs at once.
+
+        Args:
+            time (int): Absolute time of arrival at the node.
+            arcs: The arcs leaving the node.
+
+        Returns:
+            A list with the time of the next trip of each arc.
+        """
+        return self.route_map.next_trip_times(time, arcs)
 
-    def get_valid_connections(self, node):
+    def get_valid_connections(self, number, cost, time):
         """ Get a list of all the valid connections for a specific node.
 
         Args:
-            node: The node from which the connections depart.
+            number (int): Number of the node the connections depart from.
+            cost (int): Cost of the route to the node.
+            time (int): Absolute time of arrival at the node.
 
         Returns:
-            The connections of the node which are valid giving the constraints.
+            The arcs of the node which are valid giving the constraints.
         """
         return self.route_map.get_valid_connections(
-            node.number,
-            self.client.constraints,
-            node.cost_so_far,
-            node.time_so_far)
+            number,
+            self.constraints,
+            cost,
+            time)
 
-    def check_node(self, new_node):
+    def check_node(self, number, cost, time):
         """ Check if a node is worth opening.
 
         Args:
-            new_node (ISTravelNode): Node to check.
+            number (int): Number of the candidate node.
+            cost (int): Cost of the route to it.
+            time (int): Absolute time of arrival at it.
 
         Returns:
             True if the node is worth opening.
             False otherwise.
         """
 
-        if new_node.number not in self.route:
+        route = self.route
+        if route.stamp[number] != route.generation:
             return True
 
-        ct = self.route[new_node.number].time_so_far
-        cc = self.route[new_node.number].cost_so_far
+        ct = route.time[number]
+        cc = route.cost[number]
+
+        # Nodes worse than the goal are pruned, unless there are more goals.
+        goal = self.client.goal
+        if self.goal_count() != 1 or goal not in route:
+            goal = None
 
         if self.client.optimization == "tempo":
-            if (self.client.goal in self.route and
-                new_node.time_so_far > self.route[self.client.goal].time_so_far):
+            if (goal is not None and
+                time > route.time[goal]):
                 return False
-            if ct > new_node.time_so_far:
+            if ct > time:
                 return True
             elif (self.sec_optim and
-                  ct == new_node.time_so_far and
-                  cc > new_node.cost_so_far):
+                  ct == time and
+                  cc > cost):
                 return True
             return False
 
         elif self.client.optimization == "custo":
-            if (self.client.goal in self.route and
-                new_node.cost_so_far > self.route[self.client.goal].cost_so_far):
+            if (goal is not None and
+                cost > route.cost[goal]):
                 return False
-            if cc > new_node.cost_so_far:
+            if cc > cost:
                 return True
             elif (self.sec_optim and
-                  cc == new_node.cost_so_far and
-                  ct > new_node.time_so_far):
+                  cc == cost and
+                  ct > time):
                 return True
             return False
 
-    def open_node(self, new_node):
-        """ Add a newly open node to the open list.
+    def open_node(self, number, parent, arc, cost, time):
+        """ Stores a node in the route tree and adds it to the open list.
+
+        Args:
+            number (int): Number of the node to open.
+            parent (int): Number of the node it was reached from.
+            arc (int): Arc it was reached through.
+            cost (int): Cost of the route to it.
+            time (int): Absolute time of arrival at it.
+        """
+
+        self.route.add(number, parent, arc, cost, time)
+        self.insert_open(number)
+
+    def is_goal(self, number):
+        """ Goal test.
+
+        Args:
+            number (int): Number of the node to test.
+
+        Returns:
+            True if the node is one of the destinations.
+        """
+
+        return number in self.goals
+
+    def goal_count(self):
+        """ Number of goals of the search.
+
+        Returns:
+            How many destinations are searched for.
+        """
+
+        return len(self.goals)
+
+    def parameters(self, cost, time):
+        """ Orders the cost and time of a route by the client's optimization.
 
         Args:
-            new_node(ISTravelNode): The node to open
+            cost (int): Cost of the route.
+            time (int): Absolute time of arrival.
+
+        Returns:
+            Tuple with the optimized parameter and the other one.
         """
 
-        self.route[new_node.number] = new_node
-        if new_node.number not in self.open_list:
-            self.open_list.append(new_node.number)
+        if self.client.optimization == "custo":
+            return (cost, time)
+        return (time, cost)
 
-    def recreate(self):
+    def evaluate(self, number):
+        """ Evaluation function used to order the open nodes.
+
+        Args:
+            number (int): Number of the node to evaluate.
+
+        Returns:
+            The value of the parameter being optimized.
+        """
+
+        return self.parameters(self.route.cost[number],
+                               self.route.time[number])[0]
+
+    def secondary(self, number):
+        """ Value of the parameter which is not being optimized.
+
+        Args:
+            number (int): Number of the node to evaluate.
+
+        Returns:
+            The value of the secondary parameter.
+        """
+
+        return self.parameters(self.route.cost[number],
+                               self.route.time[number])[1]
+
+    def trace(self, goal):
+        """ Backtracks the route to a destination.
+
+        Args:
+            goal (int): Destination of the path.
+
+        Returns:
+            Tuple with the arcs of the route, in order, its absolute time of
+            arrival and its cost, or None if the goal was not reached.
+        """
+
+        if self.delegated is not None:
+            return self.delegated.trace(goal)
+        if goal not in self.route:
+            return None
+        return (self.route.arcs(goal),
+                self.route.time[goal],
+                self.route.cost[goal])
+
+    def recreate(self, goal=None):
         """ Recreates the path calculated.
 
         Given the tree calculated by the search algorithm, this function
         reconstructs the trip by backtracking from the goal node to the
         departure node.
 
+        Args:
+            goal (int): Destination of the path, by default the client's goal.
+
         Returns:
             A list which represents the discovered path.
         """
 
-        if self.client.goal not in self.route:
+        if goal is None:
+            goal = self.client.goal
+
+        traced = self.trace(goal)
+        if traced is None:
             return "-1"
+        arcs, time, cost = traced
 
-        curr = self.route[self.client.goal]
-        path = [str(self.client.goal)]
+        path = [str(self.client.initial)]
         # Lists each connection of the path
-        while True:
-            # check if reached top node
-            if curr.parent is None:
-                break
-            path.append(curr.connection.transport)
-            tmp = curr.parent
-            path.append(str(tmp.number))
-            curr = tmp
-
-        path.reverse()
+        for arc in arcs:
+            path.append(self.route_map.connection(arc).transport)
+            path.append(str(self.route_map.neighbour[arc]))
 
         formated_path = ""
         for node in path:
             formated_path += "{} ".format(node)
 
         # Appends total time and total cost at the end of the path
-        formated_path += "{} {}".format(self.route[self.client.goal].time_so_far -
-                                        self.client.ti,
-                                        self.route[self.client.goal].cost_so_far)
+        formated_path += "{} {}".format(time - self.client.ti, cost)
 
         return formated_path
 
 
-class ISTravelNode(Node):
-    """ A node on the route tree.
+class ISTravelPareto(ISTravelSearch):
+    """ Multi-criteria label setting search.
+
+    Instead of a single node per city, keeps the Pareto set of (time, cost)
+    labels that reached it, so that no label that could still satisfy a
+    total time or cost constraint is thrown away. The labels of a city are
+    sorted by the optimized parameter, so the other one is strictly
+    decreasing and a dominance check is a binary search.
+
+    The labels are expanded in lexicographic order of (optimized, secondary)
+    parameters, hence the first label expanded in a goal is the answer for
+    it, and the search stops once every goal has one.
 
     Attributes:
-        parent (Node): Parent of this node.
-        number (int): Number of this node.
-        connection (Connection): Connection that includes this node.
-        cost_so_far (int): Cost of the route so far.
-        time_so_far (int): Time since the beginning of time.
+        labels (dict): For each city, the sorted list of (optimized,
+            secondary, label id) of its non dominated labels.
+        label_city (array): City of each label id.
+        label_parent (array): Label each label was reached from.
+        label_arc (array): Arc each label was reached through.
+        label_cost (array): Cost of each label.
+        label_time (array): Absolute time of arrival of each label.
+        selected (dict): The first label expanded in each city.
+        dominated (set): Ids of the labels dominated after being opened.
+        goals_left (int): Number of goals without a selected label.
     """
-    def __init__(self, parent, number, connection, cost_so_far, time_so_far):
-        self.parent = parent
-        self.number = number
-        self.connection = connection
-        self.cost_so_far = cost_so_far
-        self.time_so_far = time_so_far
+
+    MULTI_GOAL = True
+    EXACT = True
+
+    def initialize(self):
+        """ Initialize the labels, the open list and the initial label. """
+        self.labels = {}
+        self.label_city = array('i')
+        self.label_parent = array('i')
+        self.label_arc = array('i')
+        self.label_cost = array('q')
+        self.label_time = array('q')
+        self.selected = {}
+        self.dominated = set()
+        self.goals_left = self.goal_count()
+        self.open_list = self.new_open_list()
+        self.open_node(self.client.initial, RouteTree.ROOT, -1, 0,
+                       self.client.ti)
+
+    def new_open_list(self):
+        """ Creates a binary heap for the open labels. """
+        return HeapFrontier()
+
+    def insert_open(self, label):
+        """ Inserts a new label in the binary heap. """
+        self.open_list.push(label, self.evaluate(label))
+
+    def evaluate(self, label):
+        """ Evaluation function used to order the open labels.
+
+        Returns:
+            The optimized parameter followed by the other one.
+        """
+        return self.parameters(self.label_cost[label], self.label_time[label])
+
+    def finished(self):
+        """ Tests if every goal has a selected label or open_list is empty. """
+        return not self.goals_left or super().finished()
+
+    def select(self):
+        """ Returns the id of the open label with the lowest parameters. """
+        return self.open_list.pop()
+
+    def expand_node(self, label):
+        """ Expands a label, unless it was dominated meanwhile.
+
+        Args:
+            label (int): Id of the label to expand.
+        """
+
+        if label in self.dominated:
+            return
+
+        number = self.label_city[label]
+        if number not in self.selected:
+            self.selected[number] = label
+
+            if self.is_goal(number):
+                self.goals_left -= 1
+
+        if self.goals_left:
+            self.expand(number,
+                        self.label_cost[label],
+                        self.label_time[label],
+                        label)
+
+    def check_node(self, number, cost, time):
+        """ Check if a label is not dominated by the labels of its city, nor
+            worse than the best goal label found so far.
+
+        Args:
+            number (int): City of the candidate label.
+            cost (int): Cost of the candidate label.
+            time (int): Absolute time of arrival of the candidate label.
+
+        Returns:
+            True if the label is worth opening.
+            False otherwise.
+        """
+
+        key = self.parameters(cost, time)
+
+        goal_labels = (self.labels.get(self.client.goal)
+                       if self.goal_count() == 1 else None)
+        if goal_labels:
+            best = goal_labels[0][:2] if self.sec_optim else goal_labels[0][:1]
+            if key[:len(best)] >= best:
+                return False
+
+        labels = self.labels.get(number)
+        if not labels:
+            return True
+
+        # Label with the largest optimized parameter not above the new one,
+        # the one with the lowest secondary parameter among them.
+        i = bisect_right(labels, (key[0], float("inf"))) - 1
+        return i < 0 or labels[i][1] > key[1]
+
+    def open_node(self, number, parent, arc, cost, time):
+        """ Adds a label to its city, dropping the labels it dominates, and
+            opens it.
+
+        Args:
+            number (int): City of the label.
+            parent (int): Label it was reached from.
+            arc (int): Arc it was reached through.
+            cost (int): Cost of the label.
+            time (int): Absolute time of arrival of the label.
+        """
+
+        primary, secondary = self.parameters(cost, time)
+        labels = self.labels.setdefault(number, [])
+        label = len(self.label_city)
+
+        i = bisect_left(labels, (primary,))
+        j = i
+        while j < len(labels) and labels[j][1] >= secondary:
+            self.dominated.add(labels[j][2])
+            j += 1
+
+        labels[i:j] = [(primary, secondary, label)]
+        self.label_city.append(number)
+        self.label_parent.append(parent)
+        self.label_arc.append(arc)
+        self.label_cost.append(cost)
+        self.label_time.append(time)
+        self.insert_open(label)
+
+    def trace(self, goal):
+        """ Backtracks the route of the label selected in a destination.
+
+        Args:
+            goal (int): Destination of the path.
+
+        Returns:
+            Tuple with the arcs of the route, in order, its absolute time of
+            arrival and its cost, or None if the goal was not reached.
+        """
+
+        if goal not in self.selected:
+            return None
+
+        label = self.selected[goal]
+        arcs = []
+        while self.label_parent[label] != RouteTree.ROOT:
+            arcs.append(self.label_arc[label])
+            label = self.label_parent[label]
+        arcs.reverse()
+
+        label = self.selected[goal]
+        return arcs, self.label_time[label], self.label_cost[label]
 
 
 class ISTravelBFS(BreadthFirstSearch, ISTravelSearch):
@@ -210,3 +703,180 @@ class ISTravelDFS(DepthFirstSearch, ISTravelSearch):
 
 class ISTravelGBFS(GreedyBestFirstSearch, ISTravelSearch):
     pass
+
+
+class ISTravelDijkstra(UniformCostSearch, ISTravelSearch):
+    """ Time dependent Dijkstra.
+
+    Exact for either optimized parameter, since leaving later never makes the
+    arrival earlier. It settles each city once, so the clients with a total
+    time or cost constraint on the parameter which is not optimized are
+    routed by ISTravelPareto instead. With secondary optimization the nodes
+    are ordered by both parameters, which is exact for "custo" but not for
+    "tempo": a later but cheaper arrival at an intermediate city may still
+    catch the same trips, so those clients are routed by ISTravelPareto too.
+    Can search for several goals at once.
+    """
+
+    MULTI_GOAL = True
+    EXACT = True
+    BIDIRECTIONAL = True
+    SINGLE_ROUTE = True
+
+    def evaluate(self, number):
+        """ Evaluation function used to order the open nodes.
+
+        Returns:
+            The optimized parameter, followed by the other one when the
+            secondary optimization is enabled.
+        """
+
+        if not self.sec_optim:
+            return super().evaluate(number)
+        return (super().evaluate(number), self.secondary(number))
+
+
+class ISTravelAStar(AStarSearch, ISTravelSearch):
+    """ A* with landmark (ALT) lower bounds as heuristic.
+
+    The bounds only use the duration and cost of the connections, so they are
+    consistent and, like Dijkstra, each city is settled at most once. Hence,
+    like Dijkstra, the clients with a total time or cost constraint on the
+    parameter which is not optimized, and the "tempo" clients with secondary
+    optimization, are routed by ISTravelPareto instead.
+    """
+
+    EXACT = True
+    BIDIRECTIONAL = True
+    SINGLE_ROUTE = True
+
+    def evaluate(self, number):
+        """ Evaluation function used to order the open nodes.
+
+        Returns:
+            The optimized parameter plus its lower bound to the goal, followed
+            by the other parameter when the secondary optimization is enabled.
+        """
+
+        if not self.sec_optim:
+            return super().evaluate(number)
+        return (super().evaluate(number), self.secondary(number))
+
+    def heuristic(self, number):
+        """ Landmark lower bound of the remaining distance to the goal.
+
+        The landmarks are built the first time a route map needs them.
+
+        Args:
+            number (int): Number of the node to estimate.
+
+        Returns:
+            The lower bound for the parameter being optimized.
+        """
+
+        if self.route_map.landmarks is None:
+            self.route_map.landmarks = LandmarkTable.build(
+                self.route_map, LandmarkTable.COUNT)
+        return self.route_map.landmarks.lower_bound(number,
+                                                    self.client.goal,
+                                                    self.client.optimization)
+
+
+class ISTravelCSA(ISTravelDijkstra):
+    """ Connection Scan Algorithm for the earliest arrival.
+
+    Scans the trips of the route map's timetable in order of departure from
+    the client's starting time, taking every trip that leaves a city already
+    reached, without any priority queue. The timetable only has one day of
+    trips, so the scan goes around it once per day until every goal was
+    reached before the current trip leaves.
+
+    Only "tempo" clients without secondary optimization are scanned, the
+    "custo" clients are routed by Dijkstra. The earliest arrival at each city
+    is also the one most within a total time constraint, which is checked for
+    each trip, but neither the cheapest one nor the one most within a total
+    cost constraint, so the clients with secondary optimization or a total
+    cost constraint are routed by ISTravelPareto.
+    """
+
+    def calculate(self):
+        """ Scans the timetable, or searches when the client can not be
+            scanned.
+        """
+
+        if self.client.optimization != "tempo":
+            return super().calculate()
+        if not self.bounded():
+            return self.delegate(ISTravelPareto)
+        self.scan()
+
+    def scan(self):
+        """ Finds the earliest arrival at the goals with one pass over the
+            trips.
+
+        A trip can only improve an arrival when its city was reached less
+        than a day before it leaves, otherwise the same trip of the day
+        before was already taken. Hence the days in which no city can take a
+        trip are skipped, and the scan stops when there are none left.
+        """
+
+        route_map = self.route_map
+        if route_map.timetable is None:
+            route_map.timetable = Timetable(route_map)
+        timetable = route_map.timetable
+
+        adjacency = self.constraints.adjacency
+        valid = adjacency.valid if adjacency is not None else None
+        neighbour = route_map.neighbour
+        duration = route_map.duration
+        cost = route_map.cost
+        # Latest arrival allowed by the total time constraints.
+        limit = min((c.max_total_time for c in self.constraints.dynamic),
+                    default=float("inf"))
+
+        ti = self.client.ti
+        self.route = route = route_map.search_tree()
+        route.add(self.client.initial, RouteTree.ROOT, -1, 0, ti)
+        stamp = route.stamp
+        generation = route.generation
+        arrival = route.time
+        reached = [self.client.initial]
+        goals = self.goals
+        bound = float("inf") # latest arrival at a goal, once all are reached
+
+        day = Connection.DAY
+        base = ti - ti % day # time previous to current day
+        start = bisect_left(timetable.departure, ti % day)
+        while timetable:
+            for time, origin, arc in zip(timetable.departure[start:],
+                                         timetable.origin[start:],
+                                         timetable.arc[start:]):
+                departure = base + time
+                if departure > bound:
+                    return
+
+                if (stamp[origin] != generation or
+                    arrival[origin] > departure or
+                    (valid is not None and not valid[arc]) or
+                    arrival[origin] + duration[arc] > limit):
+                    continue
+
+                number = neighbour[arc]
+                new_arrival = departure + duration[arc]
+                if stamp[number] != generation:
+                    reached.append(number)
+                elif arrival[number] <= new_arrival:
+                    continue
+
+                route.add(number, origin, arc, route.cost[origin] + cost[arc],
+                          new_arrival)
+                if number in goals and all(goal in route for goal in goals):
+                    bound = max(arrival[goal] for goal in goals)
+
+            start = 0
+            base += day
+            pending = [arrival[number] for number in reached
+                       if base - day < arrival[number] < bound]
+            if not pending:
+                return
+            base = max(base, min(pending) - min(pending) % day)
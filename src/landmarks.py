@@ -0,0 +1,202 @@
+""" Landmark (ALT) lower bounds
+"""
+
+from heapq import heappush, heappop
+from os import path
+
+
+class LandmarkTable(object):
+    """ Distances from a few landmark cities to every other city.
+
+    The distances use the duration and the cost of each connection as static
+    weights, so they never exceed the real time (which adds waiting) or cost
+    of a route. By the triangle inequality, the difference between the
+    distances of two cities to a landmark is a lower bound of the distance
+    between them.
+
+    Attributes:
+        COUNT (int): Default number of landmarks.
+        METRICS: Arc array of the RouteMap used as weight for each
+            optimization.
+        landmarks: The landmark cities.
+        distances: For each optimization, one list per landmark with the
+            distance to each city, or None where it can not be reached.
+    """
+
+    COUNT = 4
+
+    METRICS = {
+        "tempo": "duration",
+        "custo": "cost",
+    }
+
+    def __init__(self, landmarks, distances):
+        """ Initialize a LandmarkTable from already computed distances.
+
+        Args:
+            landmarks: The landmark cities.
+            distances: The distances of each optimization.
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, route_map, count):
+        """ Selects the landmarks and computes their distances.
+
+        The first landmark is the city farthest from the first city, each of
+        the others is the one farthest from its closest landmark. Cities
+        which can not be reached are only picked when no other is left, so
+        isolated cities do not waste landmarks.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            count (int): Number of landmarks.
+
+        Returns:
+            The new LandmarkTable.
+        """
+        cities = list(route_map.cities)
+        count = min(count, len(cities))
+        landmarks = []
+        distances = {optimization: [] for optimization in cls.METRICS}
+
+        closest = shortest_distances(route_map, cities[0], "duration")
+        while len(landmarks) < count:
+            landmark = max(
+                (city for city in cities if city not in landmarks),
+                key=lambda city: -1 if closest[city] is None else closest[city])
+            landmarks.append(landmark)
+
+            for optimization, metric in cls.METRICS.items():
+                distances[optimization].append(
+                    shortest_distances(route_map, landmark, metric))
+
+            for city, distance in enumerate(distances["tempo"][-1]):
+                if (distance is not None and
+                    (closest[city] is None or distance < closest[city])):
+                    closest[city] = distance
+
+        return cls(landmarks, distances)
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads a landmark file.
+
+        The first line has the number of landmarks and the size of the
+        distance lists, followed, for each landmark, by a line with the
+        landmark city and one line of distances per optimization, with -1
+        for the cities which can not be reached.
+
+        Args:
+            filename (str): Filename of the landmark file.
+
+        Returns:
+            The loaded LandmarkTable.
+        """
+        with open(filename, 'r') as alt_file:
+            count, _ = [int(x) for x in alt_file.readline().split(" ")]
+            landmarks = []
+            distances = {optimization: [] for optimization in cls.METRICS}
+            for _ in range(count):
+                landmarks.append(int(alt_file.readline()))
+                for optimization in cls.METRICS:
+                    distances[optimization].append(
+                        [None if x == "-1" else int(x)
+                         for x in alt_file.readline().split(" ")])
+
+        return cls(landmarks, distances)
+
+    @classmethod
+    def load_or_build(cls, route_map, map_filename, count, save):
+        """ Loads the landmarks saved next to the map file, or builds them if
+            there are none up to date.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            map_filename (str): Filename of the map file.
+            count (int): Number of landmarks.
+            save (bool): Save the built landmarks next to the map file.
+
+        Returns:
+            The LandmarkTable.
+        """
+        filename = map_filename[:map_filename.rfind('.')] + ".alt"
+        if (path.exists(filename) and
+            path.getmtime(filename) >= path.getmtime(map_filename)):
+            table = cls.load(filename)
+            if len(table.landmarks) == min(count, len(route_map.cities)):
+                return table
+
+        table = cls.build(route_map, count)
+        if save:
+            table.save(filename)
+        return table
+
+    def save(self, filename):
+        """ Writes the landmarks to a file in the format read by load.
+
+        Args:
+            filename (str): Filename of the landmark file.
+        """
+        size = len(self.distances["tempo"][0]) if self.landmarks else 0
+        with open(filename, 'w') as alt_file:
+            alt_file.write("{} {}\n".format(len(self.landmarks), size))
+            for i, landmark in enumerate(self.landmarks):
+                alt_file.write("{}\n".format(landmark))
+                for optimization in self.METRICS:
+                    alt_file.write(" ".join(
+                        "-1" if x is None else str(x)
+                        for x in self.distances[optimization][i]) + "\n")
+
+    def lower_bound(self, origin, goal, optimization):
+        """ Lower bound of the distance between two cities.
+
+        Args:
+            origin (int): Departure city.
+            goal (int): Destination city.
+            optimization (str): Parameter being optimized.
+
+        Returns:
+            The lower bound, infinite if the cities are known not to be
+            connected.
+        """
+        bound = 0
+        for distance in self.distances[optimization]:
+            if max(origin, goal) >= len(distance):
+                return 0
+            if distance[origin] is None and distance[goal] is None:
+                continue
+            if distance[origin] is None or distance[goal] is None:
+                return float("inf")
+            bound = max(bound, abs(distance[goal] - distance[origin]))
+        return bound
+
+
+def shortest_distances(route_map, origin, metric):
+    """ Dijkstra over the static weights of the connections.
+
+    Args:
+        route_map (RouteMap): RouteMap object.
+        origin (int): City where the distances start from.
+        metric (str): Arc array used as weight.
+
+    Returns:
+        List, indexed by city, with the distance from the origin, or None for
+        the cities which can not be reached.
+    """
+    weight = getattr(route_map, metric)
+    distance = [None] * (len(route_map.offsets) - 1)
+    distance[origin] = 0
+    heap = [(0, origin)]
+    while heap:
+        current, city = heappop(heap)
+        if current > distance[city]:
+            continue
+        for arc in route_map.arcs(city):
+            adjacent = route_map.neighbour[arc]
+            new = current + weight[arc]
+            if distance[adjacent] is None or new < distance[adjacent]:
+                distance[adjacent] = new
+                heappush(heap, (new, adjacent))
+    return distance
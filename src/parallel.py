@@ -0,0 +1,109 @@
+""" Parallel client routing
+"""
+
+import multiprocessing
+import os
+from time import perf_counter
+
+from client import BATCH_SIZE, batches, group_clients, route_group, in_client_order
+from instrumentation import drain, keep
+
+# Route map and search settings of the worker process.
+_state = None
+
+
+def _init_worker(state):
+    """ Stores the routing state in a worker process.
+
+    With the fork start method the state is inherited by the worker instead
+    of being pickled, so the route map pages are shared with the parent.
+
+    Args:
+        state: Tuple with the RouteMap, algorithm, queue, sec_optim,
+            ResultCache and whether the searches are traced.
+    """
+    global _state
+    _state = state
+
+
+def _route(group):
+    """ Routes one group of clients in a worker process.
+
+    Args:
+        group: The clients to route with the same search.
+
+    Returns:
+        List with the number and route information of each client, the
+        counters of the searches, if they are instrumented, and the span of
+        the search, if it is traced.
+    """
+    route_map, algorithm, queue, sec_optim, cache, tracing = _state
+    start = perf_counter()
+    paths = route_group(group, route_map, algorithm, sec_optim, queue, cache)
+    span = None
+    if tracing:
+        span = ([client.number for client in group], start, perf_counter(),
+                os.getpid())
+    return paths, drain(), span
+
+
+def _kept(results, profiler):
+    """ Keeps what comes back from the workers with the paths in this
+        process.
+
+    Args:
+        results: Iterable with the results of _route.
+        profiler (Profiler): Traces the searches of the workers, if any.
+
+    Yields:
+        The result of route_group for each group.
+    """
+    for paths, records, span in results:
+        keep(records)
+        if span is not None:
+            profiler.group(*span)
+        yield paths
+
+
+def route_parallel(clients, route_map, algorithm, queue, sec_optim, jobs,
+                   cache=None, batch_size=BATCH_SIZE, profiler=None):
+    """ Routes clients in a pool of worker processes.
+
+    The clients are read in batches, and those of a batch are grouped when
+    the algorithm can search for several goals at once. The groups are sent
+    to the workers in chunks, and the paths come back in the same order as
+    the clients.
+
+    Args:
+        clients: The Client objects, in the order of the solution file.
+        route_map (RouteMap): RouteMap object.
+        algorithm: Class of the algorithm chosen by the user.
+        queue: Class of the priority queue backend chosen by the user.
+        sec_optim (bool): Optimize secondary weight.
+        jobs (int): Number of worker processes.
+        cache (ResultCache): Cache of the routes already found, if any. Each
+            worker gets its own copy.
+        batch_size (int): Number of clients read at once, all of them if not
+            positive.
+        profiler (Profiler): Traces the search of each group, if any.
+
+    Yields:
+        The path of each client.
+    """
+    tracing = profiler is not None and profiler.events is not None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+
+    with context.Pool(jobs,
+                      initializer=_init_worker,
+                      initargs=((route_map, algorithm, queue, sec_optim,
+                                 cache, tracing),)
+                      ) as pool:
+        for batch in batches(clients, batch_size):
+            groups = group_clients(batch, algorithm.MULTI_GOAL)
+            chunksize = max(1, len(groups) // (4 * jobs))
+            results = _kept(pool.imap(_route, groups, chunksize), profiler)
+            for path in in_client_order((c.number for c in batch), results):
+                yield path
@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+""" Earliest arrival profiles
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+from bisect import bisect_left
+from collections import Counter
+import logging
+from os import path
+
+from client import Client, ClientParser
+from istravel_search import ISTravelDijkstra
+from routemap import RouteMap, Connection
+
+
+class ProfileTable(object):
+    """ Earliest arrival at the goal of some city pairs, as a function of the
+        time of the day of the departure.
+
+    The trips leaving a city repeat every day, so the profile of a pair only
+    needs one entry per departure time from the origin during a day: leaving
+    at any time, the best route is the one found for the next departure.
+    Consecutive departures with the same arrival are merged into the latest,
+    since leaving any earlier would arrive at the same time.
+
+    Only unconstrained "tempo" clients without secondary optimization are
+    answered from the profiles. They arrive as early as with the search
+    algorithms, but among the routes arriving at the same time they can get
+    another one, with another cost: the route kept for a departure was found
+    leaving at that departure, not at the client's time.
+
+    Attributes:
+        profiles (dict): For each (origin, goal) pair, the list of
+            (departure, arrival, cost, route) entries sorted by departure, with
+            the times of the first day. Empty when the goal can not be reached.
+    """
+
+    def __init__(self, profiles):
+        """ Initialize a ProfileTable from already computed profiles.
+
+        Args:
+            profiles (dict): The profiles of each pair.
+        """
+        self.profiles = profiles
+        self.departures = {pair: [entry[0] for entry in profile]
+                           for pair, profile in profiles.items()}
+
+    @classmethod
+    def build(cls, route_map, pairs):
+        """ Computes the profiles of some pairs.
+
+        One search with every goal of an origin is run for each time of the
+        day a trip leaves that origin.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            pairs: The (origin, goal) pairs.
+
+        Returns:
+            The new ProfileTable.
+        """
+        goals = {}
+        for origin, goal in pairs:
+            if origin != goal:
+                goals.setdefault(origin, set()).add(goal)
+
+        profiles = {}
+        for origin in goals:
+            for goal in goals[origin]:
+                profiles[(origin, goal)] = []
+
+            departures = set()
+            for arc in route_map.arcs(origin):
+                ti = route_map.ti[arc]
+                departures.update(range(ti,
+                                        min(route_map.last[arc],
+                                            Connection.DAY - 1) + 1,
+                                        route_map.period[arc]))
+
+            for departure in sorted(departures, reverse=True):
+                client = Client("0 {} {} {} tempo 0".format(origin,
+                                                            min(goals[origin]),
+                                                            departure))
+                alg = ISTravelDijkstra(route_map, client, False,
+                                       goals=goals[origin])
+                alg.calculate()
+
+                for goal in goals[origin]:
+                    if goal not in alg.route:
+                        continue
+                    arrival = alg.route.time[goal]
+                    profile = profiles[(origin, goal)]
+                    if profile and profile[-1][1] == arrival:
+                        continue
+                    route = alg.recreate(goal).rsplit(" ", 2)[0]
+                    profile.append((departure, arrival, alg.route.cost[goal],
+                                    route))
+
+            for goal in goals[origin]:
+                profiles[(origin, goal)].reverse()
+
+        return cls(profiles)
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads a profile file.
+
+        The first line has the number of pairs, followed, for each pair, by a
+        line with the origin, goal and number of entries, and one line per
+        entry with the departure, arrival, cost and route.
+
+        Args:
+            filename (str): Filename of the profile file.
+
+        Returns:
+            The loaded ProfileTable.
+        """
+        profiles = {}
+        with open(filename, 'r') as prof_file:
+            for _ in range(int(prof_file.readline())):
+                origin, goal, count = [int(x) for x in
+                                       prof_file.readline().split(" ")]
+                profile = []
+                for _ in range(count):
+                    departure, arrival, cost, route = \
+                        prof_file.readline().rstrip("\n").split(" ", 3)
+                    profile.append((int(departure), int(arrival), int(cost),
+                                    route))
+                profiles[(origin, goal)] = profile
+
+        return cls(profiles)
+
+    @classmethod
+    def load_or_build(cls, route_map, map_filename):
+        """ Loads the profiles saved next to the map file, building them
+            again for the same pairs if the map file changed after they were
+            saved.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+            map_filename (str): Filename of the map file.
+
+        Returns:
+            The ProfileTable.
+        """
+        filename = map_filename[:map_filename.rfind('.')] + ".prof"
+        table = cls.load(filename)
+        if path.getmtime(filename) >= path.getmtime(map_filename):
+            return table
+
+        logging.info("The profiles are older than the map, building them "
+                     "again")
+        table = cls.build(route_map, list(table.profiles))
+        table.save(filename)
+        return table
+
+    def save(self, filename):
+        """ Writes the profiles to a file in the format read by load.
+
+        Args:
+            filename (str): Filename of the profile file.
+        """
+        with open(filename, 'w') as prof_file:
+            prof_file.write("{}\n".format(len(self.profiles)))
+            for (origin, goal), profile in self.profiles.items():
+                prof_file.write("{} {} {}\n".format(origin, goal, len(profile)))
+                for entry in profile:
+                    prof_file.write("{} {} {} {}\n".format(*entry))
+
+    def answer(self, client, sec_optim):
+        """ Answers a client from the profiles.
+
+        Args:
+            client (Client): The client.
+            sec_optim (bool): Optimize secondary weight.
+
+        Returns:
+            The route information in the format of ISTravelSearch.recreate,
+            or None if the client can not be answered from the profiles.
+        """
+        pair = (client.initial, client.goal)
+        if (sec_optim or client.constraints or
+            client.optimization != "tempo" or pair not in self.profiles):
+            return None
+
+        profile = self.profiles[pair]
+        if not profile:
+            return "-1"
+
+        td = client.ti % Connection.DAY # time of the day
+        tb = client.ti - td # time previous to current day
+
+        i = bisect_left(self.departures[pair], td)
+        if i == len(profile):
+            i = 0
+            tb += Connection.DAY
+
+        _, arrival, cost, route = profile[i]
+        return "{} {} {}".format(route, tb + arrival - client.ti, cost)
+
+
+def hot_pairs(clients, count):
+    """ The pairs most requested by the clients which can be answered from
+        the profiles.
+
+    Args:
+        clients: The Client objects.
+        count (int): Maximum number of pairs, all of them if 0.
+
+    Returns:
+        List with the (origin, goal) pairs, most requested first.
+    """
+    requests = Counter((client.initial, client.goal) for client in clients
+                       if client.optimization == "tempo" and
+                       not client.constraints)
+    return [pair for pair, _ in requests.most_common(count or None)]
+
+
+def main():
+    """ Builds the profiles of the hot pairs of a client file and saves them
+        next to the map file.
+    """
+
+    parser = ArgumentParser(description="Precompute earliest arrival \
+                                profiles",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemap",
+                        help="file where the map is defined")
+    parser.add_argument("client",
+                        help="client file from which the hot pairs are taken")
+    parser.add_argument("-n", "--pairs",
+                        help="number of hot pairs (0 for all of them)",
+                        type=int,
+                        default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.INFO)
+
+    route_map = RouteMap(args.routemap)
+    clients = ClientParser(args.client).clients.values()
+    pairs = hot_pairs(clients, args.pairs)
+
+    logging.info("Building the profiles of {} pairs".format(len(pairs)))
+    table = ProfileTable.build(route_map, pairs)
+    table.save(args.routemap[:args.routemap.rfind('.')] + ".prof")
+    logging.info("Finished building the profiles")
+
+if __name__ == '__main__':
+    main()
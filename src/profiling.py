@@ -0,0 +1,137 @@
+""" Phase timing and tracing of a run
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import sys
+from time import perf_counter
+
+
+class Profiler(object):
+    """ Times the phases of a run and traces the searches.
+
+    The time of a phase does not include the phases run inside it, so the
+    time spent reading the clients while they are routed is only counted
+    once.
+
+    The trace is written in the Chrome trace event format, which can be
+    opened in chrome://tracing or Perfetto. Every phase and every search of
+    a group of clients is a span, on the process that ran it.
+
+    Attributes:
+        seconds (dict): Time spent in each phase, in the order they started.
+        events (list): The trace events, None if the run is not traced.
+        origin (float): Time the trace starts at.
+        stack (list): The phases which are running.
+    """
+
+    def __init__(self, trace=False):
+        """ Initialize a Profiler.
+
+        Args:
+            trace (bool): Keep the trace events.
+        """
+        self.seconds = {}
+        self.events = [] if trace else None
+        self.origin = perf_counter()
+        self.stack = []
+
+    @contextmanager
+    def phase(self, name, span=True):
+        """ Times a phase of the run.
+
+        Args:
+            name (str): Name of the phase.
+            span (bool): Add it to the trace.
+        """
+        self.seconds.setdefault(name, 0)
+        start = perf_counter()
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            end = perf_counter()
+            self.seconds[name] += end - start
+            if self.stack:
+                self.seconds[self.stack[-1]] -= end - start
+            if span:
+                self.span(name, start, end)
+
+    def timed(self, name, iterable):
+        """ Times the phase in which the items of an iterable are produced.
+
+        Args:
+            name (str): Name of the phase.
+            iterable: The items, produced lazily.
+
+        Yields:
+            The items of the iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name, False):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def span(self, name, start, end, pid=None, args=None):
+        """ Adds a span to the trace, if the run is traced.
+
+        Args:
+            name (str): Name of the span.
+            start (float): perf_counter when it started.
+            end (float): perf_counter when it ended.
+            pid (int): Process that ran it, this one by default.
+            args (dict): Values shown with the span.
+        """
+        if self.events is None:
+            return
+        if pid is None:
+            pid = os.getpid()
+        event = {"name": name,
+                 "ph": "X",
+                 "ts": (start - self.origin) * 1e6,
+                 "dur": (end - start) * 1e6,
+                 "pid": pid,
+                 "tid": pid}
+        if args is not None:
+            event["args"] = args
+        self.events.append(event)
+
+    def group(self, numbers, start, end, pid=None):
+        """ Adds the search of a group of clients to the trace.
+
+        Args:
+            numbers: Numbers of the clients.
+            start (float): perf_counter when it started.
+            end (float): perf_counter when it ended.
+            pid (int): Process that ran it, this one by default.
+        """
+        self.span("clients {}".format(",".join(str(n) for n in numbers)),
+                  start, end, pid, {"clients": list(numbers)})
+
+    def report(self, out=sys.stderr):
+        """ Writes the time spent in each phase.
+
+        Args:
+            out (file): File object where the table is written.
+        """
+        total = sum(self.seconds.values())
+        for name, seconds in self.seconds.items():
+            out.write("{:<12} {:10.3f} s {:6.1f}%\n".format(
+                name, seconds, 100 * seconds / total if total else 0))
+        out.write("{:<12} {:10.3f} s\n".format("total", total))
+
+    def save(self, filename):
+        """ Writes the trace in the Chrome trace event format.
+
+        Args:
+            filename (str): Name of the trace file.
+        """
+        with open(filename, 'w') as trace_file:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms"}, trace_file)
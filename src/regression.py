@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+""" Regression check of the search engines
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+from glob import glob
+import logging
+from os import path
+import random
+import sys
+from tempfile import TemporaryDirectory
+
+from client import ClientParser, group_clients, route_group
+from contraction import ContractionHierarchy
+from generator import generate_map, generate_clients
+from istravel_search import ISTravelDijkstra, ISTravelPareto
+from profiles import ProfileTable, hot_pairs
+from result_cache import ResultCache
+from routemap import RouteMap, ConnectionView
+from run import ALGORITHMS, QUEUES
+
+# The ways of answering the clients which must find routes as good as
+# ISTravelPareto: the exact engines, and Dijkstra with each of the indexes
+# and map changes which replace or alter its searches
+VARIANTS = ["dijkstra", "astar", "csa", "contraction", "profiles", "compiled",
+            "update", "result cache"]
+
+# Periods of the connections of the generated map
+PERIODS = [30, 60, 120, 240, 720, 1440]
+
+
+def answers(route_map, clients, algorithm, sec_optim, cache=None):
+    """ Routes the clients in groups, as run.py does.
+
+    Args:
+        route_map (RouteMap): RouteMap object.
+        clients: The Client objects.
+        algorithm: Class of the algorithm.
+        sec_optim (bool): Optimize secondary weight.
+        cache (ResultCache): Cache of the routes already found, if any.
+
+    Returns:
+        Dictionary with the path of each client, by client number.
+    """
+    queue = QUEUES["heap"]["class"]
+    paths = {}
+    for group in group_clients(clients, algorithm.MULTI_GOAL):
+        paths.update(route_group(group, route_map, algorithm, sec_optim,
+                                 queue, cache))
+    return paths
+
+
+def reinserted(route_map, rng):
+    """ Delta file which removes and adds back some connections, and writes
+        others with their endpoints swapped, so that the routes stay as good.
+
+    Args:
+        route_map (RouteMap): RouteMap object.
+        rng (Random): Source of the random numbers.
+
+    Returns:
+        List with the lines of the delta file.
+    """
+    lines = []
+    for number, arc in enumerate(route_map.connection_arc):
+        if arc < 0:
+            continue
+        line = str(ConnectionView(route_map, number))
+        change = rng.randrange(3)
+        if change == 0:
+            lines.extend(["- {}".format(number), "+ {}".format(line)])
+        elif change == 1:
+            a, b, rest = line.split(" ", 2)
+            lines.append("= {} {} {} {}".format(number, b, a, rest))
+    return lines
+
+
+def route_variant(variant, map_filename, clients, sec_optim, directory):
+    """ Routes the clients in one of the variants, on a map of its own.
+
+    Args:
+        variant (str): Name of the variant, one of VARIANTS.
+        map_filename (str): Filename of the map file.
+        clients: The Client objects.
+        sec_optim (bool): Optimize secondary weight.
+        directory (str): Directory for the files the variant writes.
+
+    Returns:
+        Dictionary with the path of each client, by client number.
+    """
+    route_map = RouteMap(map_filename)
+    algorithm = ISTravelDijkstra
+    cache = None
+
+    if variant in ALGORITHMS:
+        algorithm = ALGORITHMS[variant]["class"]
+    elif variant == "contraction":
+        route_map.contraction = ContractionHierarchy.build(route_map)
+    elif variant == "profiles":
+        route_map.profiles = ProfileTable.build(route_map,
+                                                hot_pairs(clients, 0))
+    elif variant == "compiled":
+        compiled = path.join(directory, "compiled.mapc")
+        route_map.save(compiled)
+        route_map = RouteMap(compiled)
+    elif variant == "update":
+        route_map.update(reinserted(route_map, random.Random(0)))
+    elif variant == "result cache":
+        # The second pass is answered from the cache.
+        cache = ResultCache(len(clients))
+        answers(route_map, clients, algorithm, sec_optim, cache)
+
+    return answers(route_map, clients, algorithm, sec_optim, cache)
+
+
+def differs(client, expected, found, sec_optim):
+    """ Tests if a path is worse than the exact one.
+
+    Args:
+        client (Client): The client.
+        expected (str): The path found by ISTravelPareto.
+        found (str): The path to check.
+        sec_optim (bool): Whether the other parameter must be as good too.
+
+    Returns:
+        True if the paths differ in the reachability of the goal, in the
+        optimized parameter or, with secondary optimization, in the other.
+    """
+    expected, found = expected.split(" "), found.split(" ")
+    if expected[1] == "-1" or found[1] == "-1":
+        return expected[1] != found[1]
+    # The paths end with the time and the cost.
+    if not sec_optim:
+        last = -2 if client.optimization == "tempo" else -1
+        return expected[last] != found[last]
+    return expected[-2:] != found[-2:]
+
+
+def check(map_filename, client_filename, variants, directory):
+    """ Compares each variant with ISTravelPareto on a map, with and without
+        secondary optimization.
+
+    Args:
+        map_filename (str): Filename of the map file.
+        client_filename (str): Filename of the client file.
+        variants: Names of the variants to check.
+        directory (str): Directory for the files the variants write.
+
+    Returns:
+        Number of paths which differ.
+    """
+    clients = list(ClientParser(client_filename).clients.values())
+    failures = 0
+    for sec_optim in (False, True):
+        expected = answers(RouteMap(map_filename), clients, ISTravelPareto,
+                           sec_optim)
+        for variant in variants:
+            found = route_variant(variant, map_filename, clients, sec_optim,
+                                  directory)
+            wrong = [client for client in clients
+                     if differs(client, expected[client.number],
+                                found[client.number], sec_optim)]
+            for client in wrong:
+                logging.warning("{} {}{}: expected {}, found {}".format(
+                    variant, map_filename, " -s" if sec_optim else "",
+                    expected[client.number], found[client.number]))
+            logging.info("{} {}{}: {} of {} clients differ".format(
+                variant, map_filename, " -s" if sec_optim else "",
+                len(wrong), len(clients)))
+            failures += len(wrong)
+    return failures
+
+
+def main():
+    """ Checks the variants on the given maps and on a generated one, and
+        exits with an error if any path differs.
+    """
+
+    samples = path.join(path.dirname(path.abspath(__file__)), "..", "samples")
+    parser = ArgumentParser(description="Compare the exact engines, indexes \
+                                and map updates with the pareto search",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemaps",
+                        help="map files, each with the client file of the \
+                            same name next to it (by default the samples)",
+                        nargs="*")
+    parser.add_argument("-v", "--variants",
+                        help="comma separated variants to check",
+                        default=",".join(VARIANTS))
+    parser.add_argument("-c", "--cities",
+                        help="number of cities of the generated map (0 skips \
+                            it)",
+                        type=int,
+                        default=300)
+    parser.add_argument("-n", "--clients",
+                        help="number of clients of the generated map",
+                        type=int,
+                        default=300)
+    parser.add_argument("-s", "--seed",
+                        help="seed of the generated map and clients",
+                        type=int,
+                        default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.INFO)
+
+    variants = args.variants.split(",")
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error("unknown variant {}".format(variant))
+
+    maps = args.routemaps or sorted(glob(path.join(samples, "*.map")))
+    failures = 0
+    with TemporaryDirectory() as directory:
+        if args.cities > 0:
+            rng = random.Random(args.seed)
+            generated = path.join(directory, "generated")
+            with open(generated + ".map", 'w') as map_file:
+                generate_map(map_file, args.cities, 4, PERIODS, rng)
+            with open(generated + ".cli", 'w') as cli_file:
+                generate_clients(cli_file, args.cities, args.clients, 0.5,
+                                 0.3, rng)
+            maps.append(generated + ".map")
+
+        for map_filename in maps:
+            failures += check(map_filename,
+                              map_filename[:map_filename.rfind('.')] + ".cli",
+                              variants, directory)
+
+    if failures:
+        logging.warning("{} paths differ from the pareto search".format(
+            failures))
+        sys.exit(1)
+    logging.info("Every path is as good as the pareto search")
+
+if __name__ == '__main__':
+    main()
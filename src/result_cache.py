@@ -0,0 +1,117 @@
+""" Client results cache
+"""
+
+from collections import OrderedDict
+
+from constraints import ConstTotalTime
+from routemap import Connection
+
+
+class ResultCache(object):
+    """ Least recently used cache of the routes found for the clients.
+
+    The connections repeat every day, so two requests which only differ by
+    whole days in the starting time have the same route, with the same total
+    time and cost. The starting time is only kept modulo one day in the key,
+    except for clients with a total time (B1) constraint, which is checked
+    against the absolute time.
+
+    Attributes:
+        size (int): Maximum number of routes kept.
+        entries (OrderedDict): The cached routes, least recently used first.
+        hits (int): Number of requests answered from the cache.
+        misses (int): Number of requests which had to be searched.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        total = self.hits + self.misses
+        return "{} hits, {} misses ({:.1%} hit rate)".format(
+            self.hits, self.misses, self.hits / total if total else 0)
+
+    @staticmethod
+    def key(client, algorithm, sec_optim, queue):
+        """ Key of a client's request.
+
+        Args:
+            client (Client): The client.
+            algorithm: Class of the algorithm.
+            sec_optim (bool): Optimize secondary weight.
+            queue: Class of the priority queue backend.
+
+        Returns:
+            Hashable key of the request.
+        """
+        signature = tuple(sorted(c.signature() for c in client.constraints))
+        if any(isinstance(c, ConstTotalTime) for c in client.constraints):
+            ti = client.ti
+        else:
+            ti = client.ti % Connection.DAY
+
+        return (client.initial, client.goal, ti, client.optimization,
+                signature, algorithm, sec_optim, queue)
+
+    def get(self, key):
+        """ Gets a cached route.
+
+        Args:
+            key: Key of the request.
+
+        Returns:
+            The route, without the client number, or None if it is not cached.
+        """
+        route = self.entries.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return route
+
+    def invalidate(self, added, removed):
+        """ Drops the routes which some changes of the route map may have made
+            wrong.
+
+        A new or better connection may give a better route to any request,
+        so every route is dropped. Otherwise only the routes which take a
+        removed connection are, since the others are still the best ones.
+
+        Args:
+            added: Connections added, or replaced by better ones.
+            removed: Connections removed or replaced.
+        """
+        if added:
+            self.entries.clear()
+            return
+
+        legs = set()
+        for connection in removed:
+            first, second = (str(node) for node in connection.nodes)
+            legs.add((first, connection.transport, second))
+            legs.add((second, connection.transport, first))
+        for key, route in list(self.entries.items()):
+            path = route.split(" ")[:-2]
+            if any(tuple(path[i:i + 3]) in legs
+                   for i in range(0, len(path) - 2, 2)):
+                del self.entries[key]
+
+    def put(self, key, route):
+        """ Caches a route, evicting the least recently used if full.
+
+        Args:
+            key: Key of the request.
+            route (str): The route, without the client number.
+        """
+        if self.size <= 0:
+            return
+
+        self.entries[key] = route
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
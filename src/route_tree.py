@@ -0,0 +1,97 @@
+""" Search tree storage
+"""
+
+from array import array
+
+
+class RouteTree(object):
+    """ The route tree of a search, in parallel integer arrays.
+
+    The cost and time of the best route found to each city are kept in
+    arrays indexed by city, so the candidates are compared without
+    allocating anything. Each route that is kept is also appended as an
+    entry with the entry of its parent and the arc it was reached through.
+    A city improved after being expanded gets a new entry, and the routes
+    found from the old one still lead back through it, so the path recreated
+    for a city always matches its cost and time.
+
+    The same tree is reused by the searches one after the other. The values
+    of a city only belong to the current search when its stamp is the
+    current generation, so a reset does not touch the arrays of the cities.
+
+    Attributes:
+        ROOT (int): Parent of the first entry of the tree.
+        generation (int): Stamp of the cities reached by the current search.
+        stamp (array): Generation in which each city was last reached.
+        entry (array): Current entry of each city.
+        cost (array): Cost of the route to each city.
+        time (array): Absolute time of arrival at each city.
+        parent (array): Entry each entry was reached from.
+        connection (array): Arc each entry was reached through.
+    """
+
+    ROOT = -1
+
+    def __init__(self, size):
+        """ Initialize an empty RouteTree.
+
+        Args:
+            size (int): Number of cities, including the unused city 0.
+        """
+        self.generation = 1
+        self.stamp = array('q', [0]) * size
+        self.entry = array('i', [-1]) * size
+        self.cost = array('q', [0]) * size
+        self.time = array('q', [0]) * size
+        self.parent = array('i')
+        self.connection = array('i')
+
+    def __contains__(self, number):
+        return (0 <= number < len(self.stamp) and
+                self.stamp[number] == self.generation)
+
+    def __len__(self):
+        return len(self.stamp)
+
+    def reset(self):
+        """ Empties the tree for a new search, without going through the
+            cities.
+        """
+        self.generation += 1
+        del self.parent[:]
+        del self.connection[:]
+
+    def add(self, number, parent, connection, cost, time):
+        """ Sets the route to a city.
+
+        Args:
+            number (int): Number of the city.
+            parent (int): City it was reached from, ROOT for the first city.
+            connection (int): Arc it was reached through.
+            cost (int): Cost of the route.
+            time (int): Absolute time of arrival.
+        """
+        self.parent.append(self.ROOT if parent == self.ROOT
+                           else self.entry[parent])
+        self.connection.append(connection)
+        self.stamp[number] = self.generation
+        self.entry[number] = len(self.parent) - 1
+        self.cost[number] = cost
+        self.time[number] = time
+
+    def arcs(self, number):
+        """ Arcs of the route to a city, from the root of the tree.
+
+        Args:
+            number (int): Number of the city, which must be in the tree.
+
+        Returns:
+            List with the arcs, in the order they are taken.
+        """
+        arcs = []
+        entry = self.entry[number]
+        while self.parent[entry] != self.ROOT:
+            arcs.append(self.connection[entry])
+            entry = self.parent[entry]
+        arcs.reverse()
+        return arcs
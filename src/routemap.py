@@ -3,28 +3,114 @@
 
 from graphviz import Graph
 
-from math import ceil
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+import mmap
+import struct
+
+from adjacency_cache import AdjacencyCache
+from route_tree import RouteTree
 
 
 class RouteMap(object):
     """Represents a map of connections between cities.
 
+    The connections are stored in compressed sparse rows: each connection
+    gives one arc from each of its endpoints, the arcs leaving a city are
+    consecutive, from its offset to its end. The attributes of the arcs are
+    kept in parallel integer arrays, the transport as a small code.
+
+    The arrays can be saved to a compiled map file, which is memory mapped
+    when loaded, so its columns are read only views of the file pages,
+    shared by every process that maps it.
+
+    Connections can be added, removed or replaced in place, one at a time or
+    from a delta file, without parsing the map again. A removed connection
+    keeps its number, with no arcs, so the numbers of the others do not
+    change. A change only moves the arcs of the cities of the connection:
+    the arcs after a deleted one move back, and a city which gets a new arc
+    is moved to the end of the arrays, unless it is already there. The
+    slots left behind are dead, without a connection, until the arrays are
+    compacted, once they are more than half of them. Only the derived
+    indexes which the change can make wrong are dropped, to be built again
+    when needed.
+
     Attributes:
         dims: Dimentions of the map.
         cities: The cities.
-        connections: The connections between the cities.
+        connections: Thin view with the Connection objects of each city.
+        landmarks (LandmarkTable): Landmark lower bounds used by A*, None
+            until they are built.
+        profiles (ProfileTable): Precomputed earliest arrivals of the most
+            requested pairs, None unless they are loaded.
+        contraction (ContractionHierarchy): Contraction hierarchy over the
+            cost of the connections, None unless it is loaded.
+        timetable (Timetable): Trips of a day sorted by departure, used by
+            the Connection Scan Algorithm, None until it is built.
+        route_tree (RouteTree): Route tree reused by the searches on the map,
+            None until the first one.
+        adjacency_cache (AdjacencyCache): Arcs filtered by the static
+            constraints of the clients.
+        offsets (array): First arc of each city, indexed by city.
+        ends (array): Arc after the last one of each city, indexed by city.
+        dead (int): Number of dead arc slots.
+        neighbour (array): Destination city of each arc.
+        arc_connection (array): Connection number of each arc, -1 for the
+            dead slots.
+        transport (array): Transport code of each arc.
+        duration (array): Duration of each arc.
+        cost (array): Cost of each arc.
+        ti (array): Start of the first periodic trip of each arc.
+        tf (array): Ending time for the periodic trips of each arc.
+        period (array): Time between trips of each arc.
+        last (array): Time of the day of the last trip of each arc.
+        endpoints (array): The two nodes of each connection, in the order
+            they were given.
+        connection_arc (array): Arc leaving the first node of each connection,
+            -1 for the removed connections.
+        transports (list): Name of each transport code.
     """
 
     CITIES = 0
     CONNECTIONS = 1
 
+    # Compiled map files start with the magic, the format version, a check
+    # value written in the native byte order, the dimentions and the size of
+    # the transport names. Each column follows with its length, at offsets
+    # aligned to 8 bytes.
+    MAGIC = b"ISTM"
+    VERSION = 1
+    CHECK = 0x01020304
+    HEADER = struct.Struct("=4sIIiiI")
+    LENGTH = struct.Struct("=q")
+    COLUMNS = ("offsets", "neighbour", "arc_connection", "transport",
+               "duration", "cost", "ti", "tf", "period", "last", "endpoints",
+               "connection_arc")
+    # Columns with a value per arc.
+    ARC_COLUMNS = ("neighbour", "arc_connection", "transport", "duration",
+                   "cost", "ti", "tf", "period", "last")
+
     def __init__(self, filename):
-        """ Initialize a RouteMap given a map file.
+        """ Initialize a RouteMap given a map file, either a text map file or
+            a compiled one.
 
         Args:
             filename (str): Filename of the map file.
         """
-        self.parse(filename)
+        self.landmarks = None
+        self.profiles = None
+        self.contraction = None
+        self.timetable = None
+        self.route_tree = None
+        self.adjacency_cache = AdjacencyCache()
+
+        with open(filename, 'rb') as map_file:
+            compiled = map_file.read(len(self.MAGIC)) == self.MAGIC
+        if compiled:
+            self.load(filename)
+        else:
+            self.parse(filename)
 
     def render(self, filename):
         """ Renders the graph to a file.
@@ -35,11 +121,11 @@ class RouteMap(object):
         dot = Graph(comment='ISTravel graph', engine='fdp')
         for city in self.cities:
             dot.node(str(city))
-        ploted = []
+        ploted = set()
         for node in self.connections:
             for edge in self.connections[node]:
                 if edge not in ploted:
-                    ploted.append(edge)
+                    ploted.add(edge)
                     dot.edge(
                         str(edge.nodes[0]),
                         str(edge.nodes[1]),
@@ -58,6 +144,75 @@ class RouteMap(object):
             self.__parsecities(map_file)
             self.__parseconnections(map_file)
 
+    def load(self, filename):
+        """ Maps a compiled map file, without parsing any connection.
+
+        Args:
+            filename (str): Filename of the compiled map file.
+
+        Raises:
+            ValueError: If the file has another version or byte order.
+        """
+        with open(filename, 'rb') as map_file:
+            view = memoryview(mmap.mmap(map_file.fileno(), 0,
+                                        access=mmap.ACCESS_READ))
+
+        magic, version, check, cities, connections, size = \
+            self.HEADER.unpack_from(view)
+        if version != self.VERSION or check != self.CHECK:
+            raise ValueError("{} is a compiled map of version {} or of "
+                             "another byte order, expected version {}"
+                             .format(filename, version, self.VERSION))
+
+        self.dims = [cities, connections]
+        self.cities = range(1, cities + 1)
+        position = self.HEADER.size
+        names = bytes(view[position:position + size]).decode()
+        self.transports = names.split("\n") if names else []
+        position = _align(position + size)
+
+        for name in self.COLUMNS:
+            length, = self.LENGTH.unpack_from(view, position)
+            position += self.LENGTH.size
+            end = position + length * array('i').itemsize
+            setattr(self, name, view[position:end].cast('i'))
+            position = _align(end)
+
+        self.ends = self.offsets[1:]
+        self.dead = 0
+        self.connections = ConnectionsView(self)
+
+    def save(self, filename):
+        """ Writes the arc arrays to a compiled map file, in the format read
+            by load.
+
+        The arrays are compacted first if the changes to the connections
+        left dead slots or moved some city.
+
+        Args:
+            filename (str): Filename of the compiled map file.
+        """
+        if self.dead or self.ends != self.offsets[1:]:
+            self.__compact(True)
+            self.__invalidate(moved=True, shorter=False, retimed=False,
+                              recosted=False)
+
+        names = "\n".join(self.transports).encode()
+        with open(filename, 'wb') as map_file:
+            map_file.write(self.HEADER.pack(self.MAGIC, self.VERSION,
+                                            self.CHECK, self.dims[self.CITIES],
+                                            self.dims[self.CONNECTIONS],
+                                            len(names)))
+            map_file.write(names)
+            _pad(map_file)
+
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                map_file.write(self.LENGTH.pack(len(column)))
+                map_file.write(bytes(column) if isinstance(column, memoryview)
+                               else column.tobytes())
+                _pad(map_file)
+
     def __parsedims(self, map_file):
         """ Extracts the dimentions from the given file.
 
@@ -76,39 +231,524 @@ class RouteMap(object):
         self.cities = range(1, self.dims[self.CITIES]+1)
 
     def __parseconnections(self, map_file):
-        """ Parses the connections between cities.
+        """ Parses the connections between cities into the arc arrays.
 
         Args:
             map_file (file): The file object of the map.
         """
-        self.connections = {}
+        self.transports = []
+        codes = {}
+        self.endpoints = array('i')
+        fields = [array('i') for _ in range(7)]
         for line in map_file:
             connection = Connection(line)
 
-            nodes = connection.getNodes()
-            for node in nodes:
-                if not self.connections.get(node):
-                    self.connections[node] = []
-                self.connections[node].append(connection)
+            if connection.transport not in codes:
+                codes[connection.transport] = len(self.transports)
+                self.transports.append(connection.transport)
 
-    def get_valid_connections(self, node, constraints, current_cost, duration_so_far):
+            self.endpoints.extend(connection.getNodes())
+            for column, value in zip(fields, (codes[connection.transport],
+                                              connection.duration,
+                                              connection.cost,
+                                              connection.ti,
+                                              connection.tf,
+                                              connection.period,
+                                              connection.last)):
+                column.append(value)
+
+        self.__build_arcs(fields)
+        self.connections = ConnectionsView(self)
+
+    def __build_arcs(self, fields):
+        """ Sorts the arcs of both endpoints of every connection by city,
+            keeping the order of the connections within each city.
+
+        Args:
+            fields: Arrays with the transport code, duration, cost, ti, tf,
+                period and last trip of each connection.
         """
+        size = max(self.dims[self.CITIES],
+                   max(self.endpoints, default=0)) + 2
+
+        self.offsets = array('i', [0]) * size
+        for node in self.endpoints:
+            self.offsets[node + 1] += 1
+        for city in range(1, size):
+            self.offsets[city] += self.offsets[city - 1]
+
+        arcs = len(self.endpoints)
+        self.neighbour = array('i', [0]) * arcs
+        self.arc_connection = array('i', [0]) * arcs
+        self.connection_arc = array('i', [0]) * (arcs // 2)
+        columns = [array('i', [0]) * arcs for _ in fields]
+
+        position = self.offsets[:]
+        for arc_end, node in enumerate(self.endpoints):
+            number = arc_end // 2
+            arc = position[node]
+            position[node] += 1
+            if arc_end % 2 == 0:
+                self.connection_arc[number] = arc
+            self.neighbour[arc] = self.endpoints[arc_end ^ 1]
+            self.arc_connection[arc] = number
+            for column, field in zip(columns, fields):
+                column[arc] = field[number]
+
+        (self.transport, self.duration, self.cost,
+         self.ti, self.tf, self.period, self.last) = columns
+        self.ends = self.offsets[1:]
+        self.dead = 0
+
+    def update(self, delta_file):
+        """ Applies the changes of a delta file to the connections.
+
+        Each line of a delta file is one change:
+            + <connection>           adds a connection, after all the others
+            - <number>               removes a connection
+            = <number> <connection>  replaces a connection
+        where a connection is written as a line of the map file and a number
+        is the position of the connection in the map file, starting at 0,
+        the added connections numbered after the others. Empty lines are
+        skipped. The whole file is checked before any change is applied.
+
+        Args:
+            delta_file: File object, or any iterable of lines, of the delta.
+
+        Returns:
+            The connections added, with the replacements which may give a
+            faster or cheaper route, and the connections removed or
+            replaced, as lists of Connection objects, so that the routes
+            found before the changes can be invalidated.
+
+        Raises:
+            ValueError: If a line is not a change, or its number is not a
+                connection of the map.
         """
-        valid_connections = []
+        changes = []
+        removed = set()
+        count = len(self.connection_arc)
+        for line in delta_file:
+            line = line.strip()
+            if not line:
+                continue
+            operation, _, change = line.partition(" ")
+            try:
+                if operation == "+":
+                    changes.append((operation, count, Connection(change)))
+                    count += 1
+                    continue
+                number, _, connection = change.partition(" ")
+                number = int(number)
+                if operation == "=":
+                    connection = Connection(connection)
+                elif operation != "-" or connection:
+                    raise ValueError("unknown change")
+            except (ValueError, IndexError) as error:
+                raise ValueError("Invalid change {}: {}".format(line, error))
+            if (not 0 <= number < count or number in removed or
+                    number < len(self.connection_arc) and
+                    self.connection_arc[number] < 0):
+                raise ValueError("Invalid change {}: no connection {}"
+                                 .format(line, number))
+            if operation == "-":
+                removed.add(number)
+            changes.append((operation, number, connection))
+
+        added, dropped = [], []
+        for operation, number, connection in changes:
+            if operation == "+":
+                self.add_connection(connection)
+                added.append(connection)
+            elif operation == "-":
+                dropped.append(self.remove_connection(number))
+            else:
+                old = self.replace_connection(number, connection)
+                dropped.append(old)
+                if connection.improves(old):
+                    added.append(connection)
+        return added, dropped
+
+    def add_connection(self, connection):
+        """ Adds a connection to the map, after all the others.
 
-        if not constraints:
-            valid_connections = [con for con in self.connections[node]]
+        Args:
+            connection (Connection): The new connection.
+
+        Returns:
+            The number of the new connection.
+        """
+        self.__detach_columns()
+        number = len(self.connection_arc)
+        self.connection_arc.append(-1)
+        self.endpoints.extend(connection.getNodes())
+        self.__insert_arcs(number, connection)
+        self.dims[self.CONNECTIONS] += 1
+        self.__compact()
+
+        self.__invalidate(moved=True, shorter=True, retimed=True,
+                          recosted=True)
+        return number
+
+    def remove_connection(self, number):
+        """ Removes a connection from the map.
+
+        Args:
+            number (int): Number of the connection.
+
+        Returns:
+            The removed Connection.
+        """
+        self.__detach_columns()
+        old = Connection(str(ConnectionView(self, number)))
+        self.__delete_arcs(number)
+        self.connection_arc[number] = -1
+        self.endpoints[2 * number] = self.endpoints[2 * number + 1] = 0
+        self.dims[self.CONNECTIONS] -= 1
+        self.__compact()
+
+        self.__invalidate(moved=True, shorter=False, retimed=True,
+                          recosted=True)
+        return old
+
+    def replace_connection(self, number, connection):
+        """ Replaces a connection of the map, keeping its number.
+
+        The arcs are changed in place when the connection keeps the same
+        endpoints, otherwise they are moved to the new ones.
+
+        Args:
+            number (int): Number of the connection.
+            connection (Connection): The new connection.
+
+        Returns:
+            The replaced Connection.
+        """
+        self.__detach_columns()
+        old = Connection(str(ConnectionView(self, number)))
+        if sorted(old.nodes) != sorted(connection.nodes):
+            self.__delete_arcs(number)
+            self.endpoints[2 * number:2 * number + 2] = \
+                array('i', connection.getNodes())
+            self.__insert_arcs(number, connection)
+            self.__compact()
+            self.__invalidate(moved=True, shorter=True, retimed=True,
+                              recosted=True)
+            return old
+
+        arcs = [self.connection_arc[number]]
+        arcs.append(self.twin(arcs[0]))
+        if old.nodes != connection.nodes:
+            self.connection_arc[number] = arcs[1]
+            self.endpoints[2 * number:2 * number + 2] = \
+                array('i', connection.getNodes())
+        for arc in arcs:
+            for name, value in zip(self.ARC_COLUMNS[2:],
+                                   self.__values(connection)):
+                getattr(self, name)[arc] = value
+
+        self.__invalidate(moved=False,
+                          shorter=(connection.cost < old.cost or
+                                   connection.duration < old.duration),
+                          retimed=((old.ti, old.tf, old.period) !=
+                                   (connection.ti, connection.tf,
+                                    connection.period)),
+                          recosted=connection.cost != old.cost,
+                          arcs=arcs)
+        return old
+
+    def __detach_columns(self):
+        """ Copies the columns mapped from a compiled map file to arrays, so
+            that they can be changed.
+        """
+        if not isinstance(self.offsets, memoryview):
+            return
+        for name in self.COLUMNS:
+            column = array('i')
+            column.frombytes(getattr(self, name).cast('B'))
+            setattr(self, name, column)
+        self.ends = self.offsets[1:]
+        # The cached adjacencies test the old columns.
+        self.adjacency_cache.clear()
+
+    def __values(self, connection):
+        """ Values of the arcs of a connection, in the arc columns after the
+            neighbour and the connection number.
+
+        Args:
+            connection (Connection): The connection.
+
+        Returns:
+            Tuple with the transport code, duration, cost, ti, tf, period and
+            last trip.
+        """
+        if connection.transport not in self.transports:
+            self.transports.append(connection.transport)
+        return (self.transports.index(connection.transport),
+                connection.duration, connection.cost, connection.ti,
+                connection.tf, connection.period, connection.last)
+
+    def __insert_arcs(self, number, connection):
+        """ Inserts the arcs of a connection, after the arcs of the
+            connections with lower numbers of each endpoint.
+
+        Args:
+            number (int): Number of the connection.
+            connection (Connection): The connection.
+        """
+        nodes = connection.getNodes()
+        if max(nodes) >= len(self.ends):
+            count = max(nodes) + 1 - len(self.ends)
+            end = len(self.neighbour)
+            self.ends.extend([end] * count)
+            self.offsets[-1:] = array('i', [end] * (count + 1))
+        if max(nodes) > self.dims[self.CITIES]:
+            self.dims[self.CITIES] = max(nodes)
+            self.cities = range(1, max(nodes) + 1)
+
+        values = self.__values(connection)
+        for end, node in enumerate(nodes):
+            if self.ends[node] != len(self.neighbour):
+                self.__relocate(node)
+            start, stop = self.offsets[node], self.ends[node]
+            arc = start + bisect_right(self.arc_connection[start:stop],
+                                       number)
+            for name, value in zip(self.ARC_COLUMNS,
+                                   (nodes[end ^ 1], number) + values):
+                getattr(self, name).insert(arc, value)
+            self.ends[node] += 1
+            self.__renumber(node)
+
+    def __delete_arcs(self, number):
+        """ Deletes the arcs of a connection, moving back the arcs after them
+            in their cities.
+
+        Args:
+            number (int): Number of the connection.
+        """
+        first = self.connection_arc[number]
+        arcs = [(first, self.endpoints[2 * number]),
+                (self.twin(first), self.endpoints[2 * number + 1])]
+        # The last arc first, so that the other one keeps its position.
+        for arc, node in sorted(arcs, reverse=True):
+            stop = self.ends[node]
+            for name in self.ARC_COLUMNS:
+                column = getattr(self, name)
+                column[arc:stop - 1] = column[arc + 1:stop]
+            self.arc_connection[stop - 1] = -1
+            self.ends[node] = stop - 1
+            self.dead += 1
+        for node in {node for _, node in arcs}:
+            self.__renumber(node)
+
+    def __relocate(self, node):
+        """ Moves the arcs of a city to the end of the arrays, where arcs can
+            be added to it.
+
+        Args:
+            node (int): Number of the city.
+        """
+        start, stop = self.offsets[node], self.ends[node]
+        end = len(self.neighbour)
+        for name in self.ARC_COLUMNS:
+            column = getattr(self, name)
+            column.extend(column[start:stop])
+        self.arc_connection[start:stop] = array('i', [-1]) * (stop - start)
+        self.dead += stop - start
+        self.offsets[node] = end
+        self.ends[node] = end + stop - start
+
+    def __renumber(self, node):
+        """ Points the connections which start at a city to their arcs, after
+            the arcs of the city moved.
+
+        Args:
+            node (int): Number of the city.
+        """
+        # Backwards, so that a connection from the city to itself ends up
+        # with the first of its arcs.
+        for arc in reversed(self.arcs(node)):
+            number = self.arc_connection[arc]
+            if self.endpoints[2 * number] == node:
+                self.connection_arc[number] = arc
+
+    def __compact(self, force=False):
+        """ Drops the dead slots of the arrays, with the cities in order.
+
+        Args:
+            force (bool): Compact even if less than half the slots are dead.
+        """
+        if not force and 2 * self.dead <= len(self.neighbour):
+            return
+
+        offsets = array('i', [0]) * len(self.offsets)
+        columns = [array('i') for _ in self.ARC_COLUMNS]
+        old = [getattr(self, name) for name in self.ARC_COLUMNS]
+        for node in range(len(self.ends)):
+            start, stop = self.offsets[node], self.ends[node]
+            offsets[node] = len(columns[0])
+            for column, values in zip(columns, old):
+                column.extend(values[start:stop])
+        offsets[-1] = len(columns[0])
+
+        self.connection_arc = array(
+            'i', [arc - self.offsets[node] + offsets[node] if arc >= 0
+                  else -1 for arc, node in zip(self.connection_arc,
+                                               self.endpoints[::2])])
+        for name, column in zip(self.ARC_COLUMNS, columns):
+            setattr(self, name, column)
+        self.offsets = offsets
+        self.ends = offsets[1:]
+        self.dead = 0
+
+    def __invalidate(self, moved, shorter, retimed, recosted, arcs=()):
+        """ Drops the derived indexes which a change of the connections made
+            wrong.
+
+        Args:
+            moved (bool): The arcs were inserted or deleted, so the others
+                changed their numbers.
+            shorter (bool): Some arc got faster or cheaper, or was added.
+            retimed (bool): The trips of some arc changed.
+            recosted (bool): The cost of some arc changed.
+            arcs: The arcs changed in place, when they were not moved.
+        """
+        # The profiles are routes, which any change may make better or wrong.
+        self.profiles = None
+        if moved:
+            self.adjacency_cache.clear()
+        else:
+            self.adjacency_cache.discard(arcs)
+        if moved or retimed:
+            self.timetable = None
+        if moved or recosted:
+            self.contraction = None
+        # Longer or removed arcs keep the landmark bounds below the distances.
+        if shorter:
+            self.landmarks = None
+
+    def arcs(self, node):
+        """ Arcs leaving a city.
+
+        Args:
+            node (int): Number of the city.
+
+        Returns:
+            The range of the arcs of the city.
+        """
+        return range(self.offsets[node], self.ends[node])
+
+    def connection(self, arc):
+        """ Connection of an arc.
+
+        Args:
+            arc (int): Number of the arc.
+
+        Returns:
+            A ConnectionView of the connection the arc belongs to.
+        """
+        return ConnectionView(self, self.arc_connection[arc])
+
+    def twin(self, arc):
+        """ Arc of the same connection, taken the other way.
+
+        Args:
+            arc (int): Number of the arc.
+
+        Returns:
+            The arc which leaves the destination of the arc through the same
+            connection.
+        """
+        number = self.arc_connection[arc]
+        if self.connection_arc[number] != arc:
+            return self.connection_arc[number]
+        for other in self.arcs(self.endpoints[2 * number + 1]):
+            if self.arc_connection[other] == number and other != arc:
+                return other
+
+    def next_trip_times(self, current_time, arcs):
+        """ Calculates the time of the next trip of several arcs at once.
+
+        Args:
+            current_time (int): Current absolute time.
+            arcs: The arcs, either a range or a sequence of arc numbers.
+        Returns:
+            A list with the time of the next trip of each arc.
+        """
+        if isinstance(arcs, range):
+            columns = (column[arcs.start:arcs.stop]
+                       for column in (self.ti, self.last, self.period))
         else:
-            for connection in self.connections[node]:
-                valid = True
-                for constraint in constraints:
-                    if not constraint.check_connection(connection, current_cost, duration_so_far):
-                        valid = False
-                        break
-                if valid:
-                    valid_connections.append(connection)
+            columns = (map(column.__getitem__, arcs)
+                       for column in (self.ti, self.last, self.period))
 
-        return valid_connections
+        day = Connection.DAY
+        td = current_time % day # time of the day
+        tb = current_time - td # time previous to current day
+
+        return [tb + ti if td <= ti else
+                tb + day + ti if td > last else
+                current_time + (ti - td) % period
+                for ti, last, period in zip(*columns)]
+
+    def search_tree(self):
+        """ Gets the route tree of the map, empty for a new search.
+
+        Every search on the map reuses the same tree, so the route found by
+        a search is only kept until the next one starts.
+
+        Returns:
+            The empty RouteTree.
+        """
+        if self.route_tree is None or len(self.route_tree) < len(self.offsets) - 1:
+            self.route_tree = RouteTree(len(self.offsets) - 1)
+        else:
+            self.route_tree.reset()
+        return self.route_tree
+
+    def get_valid_connections(self, node, constraints, current_cost, duration_so_far):
+        """ Get the arcs leaving a city which respect all the constraints.
+
+        Args:
+            node (int): Number of the city.
+            constraints (CompiledConstraints): The client's constraints.
+            current_cost (int): Current total route cost.
+            duration_so_far (int): Current total route time.
+
+        Returns:
+            The valid arcs.
+        """
+        if not constraints:
+            return self.arcs(node)
+
+        return constraints.valid_arcs(node, current_cost, duration_so_far)
+
+
+class ConnectionsView(Mapping):
+    """ Read only view of the arcs as lists of Connection objects per city.
+
+    Attributes:
+        route_map (RouteMap): RouteMap object with the arc arrays.
+    """
+
+    def __init__(self, route_map):
+        self.route_map = route_map
+
+    def __getitem__(self, node):
+        if not 0 <= node < len(self.route_map.offsets) - 1:
+            raise KeyError(node)
+        arcs = self.route_map.arcs(node)
+        if not arcs:
+            raise KeyError(node)
+        return [self.route_map.connection(arc) for arc in arcs]
+
+    def __iter__(self):
+        for node in range(len(self.route_map.offsets) - 1):
+            if self.route_map.arcs(node):
+                yield node
+
+    def __len__(self):
+        return sum(1 for _ in self)
 
 
 class Connection(object):
@@ -122,6 +762,7 @@ class Connection(object):
         ti (int): Start of the first periodic trip.
         tf (int): Ending time for the periodic trips.
         period (int): Time between trips.
+        last (int): Time of the day of the last trip.
     """
 
     DAY = 1440
@@ -141,6 +782,31 @@ class Connection(object):
         self.ti = int(params[5])
         self.tf = int(params[6])
         self.period = int(params[7])
+        self.last = last_trip_time(self.ti, self.tf, self.period)
+
+    def __str__(self):
+        """ The connection as a line of the map file. """
+        return "{} {} {} {} {} {} {} {}".format(
+            self.nodes[0], self.nodes[1], self.transport, self.duration,
+            self.cost, self.ti, self.tf, self.period)
+
+    def improves(self, other):
+        """ Checks whether replacing another connection by this one may give
+            a faster or cheaper route.
+
+        Args:
+            other (Connection): The connection replaced.
+
+        Returns:
+            False if this connection joins the same cities with the same
+            transport and trips, and is not faster nor cheaper.
+        """
+        return (sorted(self.nodes) != sorted(other.nodes) or
+                self.transport != other.transport or
+                (self.ti, self.tf, self.period) !=
+                (other.ti, other.tf, other.period) or
+                self.duration < other.duration or
+                self.cost < other.cost)
 
     def getNodes(self):
         """ Getter for the nodes which are connected by this connection.
@@ -174,14 +840,113 @@ class Connection(object):
             The time at which the next trip will occur.
         """
 
-        td = current_time % self.DAY # time of the day
-        tb = current_time - td # time previous to current day
+        return next_trip_time(current_time, self.ti, self.last, self.period)
+
+
+class ConnectionView(Connection):
+    """ A connection read from the arc arrays of a RouteMap.
+
+    Attributes:
+        route_map (RouteMap): RouteMap object with the arc arrays.
+        number (int): Number of the connection, in the order of the map file.
+    """
+
+    def __init__(self, route_map, number):
+        self.route_map = route_map
+        self.number = number
+
+    def __eq__(self, other):
+        return (isinstance(other, ConnectionView) and
+                self.route_map is other.route_map and
+                self.number == other.number)
+
+    def __hash__(self):
+        return self.number
+
+    @property
+    def nodes(self):
+        return list(self.route_map.endpoints[2*self.number:2*self.number+2])
+
+    @property
+    def transport(self):
+        return self.route_map.transports[self.__column(self.route_map.transport)]
+
+    @property
+    def duration(self):
+        return self.__column(self.route_map.duration)
+
+    @property
+    def cost(self):
+        return self.__column(self.route_map.cost)
+
+    @property
+    def ti(self):
+        return self.__column(self.route_map.ti)
+
+    @property
+    def tf(self):
+        return self.__column(self.route_map.tf)
+
+    @property
+    def period(self):
+        return self.__column(self.route_map.period)
+
+    @property
+    def last(self):
+        return self.__column(self.route_map.last)
+
+    def __column(self, column):
+        """ Value of the connection in one of the arc arrays. """
+        return column[self.route_map.connection_arc[self.number]]
+
+
+def _align(position):
+    """ Rounds a position of a compiled map file up to a multiple of 8. """
+    return (position + 7) // 8 * 8
+
+
+def _pad(map_file):
+    """ Pads a compiled map file being written up to a multiple of 8. """
+    map_file.write(bytes(_align(map_file.tell()) - map_file.tell()))
+
+
+def last_trip_time(ti, tf, period):
+    """ Calculates the time of the day of the last trip of a periodic
+        connection.
+
+    Args:
+        ti (int): Start of the first periodic trip.
+        tf (int): Ending time for the periodic trips.
+        period (int): Time between trips.
+    Returns:
+        The time of the last trip.
+    """
+
+    return tf - (tf - ti) % period
+
+
+def next_trip_time(current_time, ti, last, period):
+    """ Calculates the time of the next trip of a periodic connection.
+
+    When the last trip of the day already left, the next one is the first
+    trip of the following day.
+
+    Args:
+        current_time (int): Current absolute time.
+        ti (int): Start of the first periodic trip.
+        last (int): Time of the day of the last trip.
+        period (int): Time between trips.
+    Returns:
+        The time at which the next trip will occur.
+    """
+
+    td = current_time % Connection.DAY # time of the day
+    tb = current_time - td # time previous to current day
 
-        if td <= self.ti:
-            return tb + self.ti
+    if td <= ti:
+        return tb + ti
 
-        tl = self.tf - (self.tf - self.ti) % self.period # time of the last transport
-        if td > tl:
-            return self.next_trip_time(tb + self.DAY)
+    if td > last:
+        return tb + Connection.DAY + ti
 
-        return tb + self.ti + ceil((td-self.ti)/self.period)*self.period
+    return current_time + (ti - td) % period
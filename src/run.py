@@ -3,11 +3,23 @@
 from argparse import ArgumentParser
 from argparse import ArgumentDefaultsHelpFormatter
 from routemap import RouteMap
-from client import ClientParser
+from client import BATCH_SIZE, read_clients, batches, group_clients, route_group, in_client_order
+import cProfile
+from contextlib import nullcontext
 import logging
 import sys
+from time import perf_counter
 
 from istravel_search import *
+from frontier import HeapFrontier, BucketFrontier
+from landmarks import LandmarkTable
+from profiles import ProfileTable
+from contraction import ContractionHierarchy
+from adjacency_cache import AdjacencyCache
+from parallel import route_parallel
+from result_cache import ResultCache
+from instrumentation import StatsWriter, instrument, drain
+from profiling import Profiler
 
 # Dictionary for the implemented algorithms
 ALGORITHMS = {
@@ -20,6 +32,32 @@ ALGORITHMS = {
     }, "gbfs": {
         "class": ISTravelGBFS,
         "label": "greedy best first search"
+    }, "dijkstra": {
+        "class": ISTravelDijkstra,
+        "label": "dijkstra"
+    }, "astar": {
+        "class": ISTravelAStar,
+        "label": "A* with landmarks"
+    }, "pareto": {
+        "class": ISTravelPareto,
+        "label": "pareto label setting search"
+    }, "csa": {
+        "class": ISTravelCSA,
+        "label": "connection scan algorithm"
+    }
+}
+
+# Number of paths written to the solution file at once
+WRITE_BATCH = 1024
+
+# Dictionary for the priority queue backends
+QUEUES = {
+    "heap": {
+        "class": HeapFrontier,
+        "label": "binary heap"
+    }, "bucket": {
+        "class": BucketFrontier,
+        "label": "bucket queue"
     }
 }
 
@@ -51,7 +89,8 @@ def main():
     parser.add_argument("routemap",
                         help="file where the map is defined")
     parser.add_argument("client",
-                        help="file where all clients' requests are defined")
+                        help="file where all clients' requests are defined \
+                            (- for the standard input)")
 
     # Mandatory to specify one and only one algorithm.
     algorithms = parser.add_mutually_exclusive_group(required=True)
@@ -61,6 +100,74 @@ def main():
                             help="Use breadth-first search")
     algorithms.add_argument("-gbfs", action='store_true',
                             help="Use greedy best-first search")
+    algorithms.add_argument("-dijkstra", action='store_true',
+                            help="Use time dependent dijkstra")
+    algorithms.add_argument("-astar", action='store_true',
+                            help="Use A* with landmark lower bounds")
+    algorithms.add_argument("-pareto", action='store_true',
+                            help="Use pareto label setting search")
+    algorithms.add_argument("-csa", action='store_true',
+                            help="Use the connection scan algorithm for the \
+                                tempo clients")
+
+    parser.add_argument("-q", "--queue",
+                        choices=QUEUES.keys(),
+                        default="heap",
+                        help="Priority queue backend")
+
+    parser.add_argument("-lm", "--landmarks",
+                        help="number of landmarks used by A*",
+                        type=int,
+                        default=LandmarkTable.COUNT)
+    parser.add_argument("-sl", "--save-landmarks",
+                        help="save the landmarks next to the map file",
+                        action="store_true")
+
+    parser.add_argument("-pf", "--profiles",
+                        help="answer the hot pairs from the profiles saved \
+                            next to the map file by profiles.py, building \
+                            them again if the map file changed since",
+                        action="store_true")
+
+    parser.add_argument("-ch", "--contraction",
+                        help="answer the custo clients without constraints \
+                            on the connections from the contraction \
+                            hierarchy saved next to the map file, building \
+                            and saving it if there is none up to date",
+                        action="store_true")
+
+    parser.add_argument("-u", "--update",
+                        help="delta file with changes to the connections, \
+                            applied to the map after loading what is saved \
+                            next to it (can be repeated)",
+                        action="append",
+                        default=[])
+
+    parser.add_argument("-ac", "--adjacency-cache",
+                        help="memory cap, in MiB, of the adjacencies filtered \
+                            by the static constraints",
+                        type=int,
+                        default=AdjacencyCache.CAPACITY // 2**20)
+
+    parser.add_argument("-rc", "--result-cache",
+                        help="number of routes kept to answer repeated \
+                            requests without searching (0 disables it)",
+                        type=int,
+                        default=0)
+
+    parser.add_argument("-o", "--output",
+                        help="solution file (- for the standard output), by \
+                            default the client file with the .sol extension")
+    parser.add_argument("-b", "--batch-size",
+                        help="number of clients read, grouped and routed at \
+                            once (0 reads all of them first)",
+                        type=int,
+                        default=BATCH_SIZE)
+
+    parser.add_argument("-st", "--stats",
+                        choices=StatsWriter.FORMATS.keys(),
+                        help="write the counters of the search of each \
+                            client next to the solution file")
 
     parser.add_argument("-ps", "--print-solution",
                         action="store_true",
@@ -69,6 +176,19 @@ def main():
                         action="store_true",
                         help="Enable secondary parameter optimization")
 
+    parser.add_argument("--profile",
+                        help="write the time spent in each phase of the run to \
+                            the standard error",
+                        action="store_true")
+    parser.add_argument("--trace",
+                        help="write the phases and the search of each group \
+                            of clients to this Chrome trace file (implies \
+                            --profile)")
+    parser.add_argument("--cprofile",
+                        help="profile the routing with cProfile and save the \
+                            statistics to this file (only the main process \
+                            with --jobs)")
+
     parser.add_argument("-p", "--plot",
                         help="plot the graph map",
                         action="store_true")
@@ -82,12 +202,21 @@ def main():
                         help="number of runs",
                         type=int,
                         default=1)
+    parser.add_argument("-j", "--jobs",
+                        help="number of processes routing the clients",
+                        type=int,
+                        default=1)
     parser.add_argument("-ns", "--no-sol",
                         help="do not write solution file (to measure algorithm \
                             performance)",
                         action="store_false")
 
     args = parser.parse_args()
+    if args.client == "-" and args.runs > 1:
+        parser.error("the standard input can only be routed once")
+    if (args.stats is not None and args.client == "-" and
+        args.output in (None, "-")):
+        parser.error("the counters need a solution or client file")
 
     logging.basicConfig(format='%(asctime)s %(message)s',
                         datefmt='%Y/%m/%d %H:%M:%S',
@@ -96,21 +225,67 @@ def main():
                             (4-args.verbosity) if args.verbosity < 4 else 1
                         ))
 
+    # time the phases of the run
+    profiling = args.profile or args.trace is not None
+    profiler = Profiler(args.trace is not None)
+
     # parse the map file
     logging.debug("Parsing the route map file")
-    route_map = RouteMap(args.routemap)
+    with profiler.phase("map parse"):
+        route_map = RouteMap(args.routemap)
+    route_map.adjacency_cache.capacity = args.adjacency_cache * 2**20
     logging.debug("Finished parsing the route map file")
 
     # plot the graph if needed
     if args.plot:
         logging.debug("Plotting the map graph")
-        route_map.render(args.routemap)
+        with profiler.phase("render"):
+            route_map.render(args.routemap)
         logging.debug("Finished plotting the map graph")
 
-    # parse the client file
-    logging.debug("Parsing the client file")
-    clients = ClientParser(args.client).clients
-    logging.debug("Finished parsing the client file")
+    # load the landmarks used by A*
+    if args.astar:
+        logging.debug("Loading the landmarks")
+        with profiler.phase("landmarks"):
+            route_map.landmarks = LandmarkTable.load_or_build(
+                route_map,
+                args.routemap,
+                args.landmarks,
+                args.save_landmarks)
+        logging.debug("Finished loading the landmarks")
+
+    # load the precomputed profiles
+    if args.profiles:
+        logging.debug("Loading the profiles")
+        with profiler.phase("profiles"):
+            route_map.profiles = ProfileTable.load_or_build(route_map,
+                                                            args.routemap)
+        logging.debug("Finished loading the profiles")
+
+    # load the contraction hierarchy
+    if args.contraction:
+        logging.debug("Loading the contraction hierarchy")
+        with profiler.phase("contraction"):
+            route_map.contraction = ContractionHierarchy.load_or_build(
+                route_map, args.routemap, True)
+        logging.debug("Finished loading the contraction hierarchy")
+
+    # apply the changes to the connections
+    for delta in args.update:
+        logging.debug("Applying the delta file {}".format(delta))
+        with profiler.phase("update"), open(delta, 'r') as delta_file:
+            added, removed = route_map.update(delta_file)
+        logging.info("Applied {}: {} connections added or improved, {} "
+                     "removed or replaced".format(delta, len(added),
+                                                  len(removed)))
+    # build again what the changes made wrong
+    if args.astar and route_map.landmarks is None:
+        with profiler.phase("landmarks"):
+            route_map.landmarks = LandmarkTable.build(route_map,
+                                                      args.landmarks)
+    if args.contraction and route_map.contraction is None:
+        with profiler.phase("contraction"):
+            route_map.contraction = ContractionHierarchy.build(route_map)
 
     # check which algorithm to use
     if args.bfs:
@@ -119,48 +294,226 @@ def main():
         algorithm = ALGORITHMS["dfs"]
     elif args.gbfs:
         algorithm = ALGORITHMS["gbfs"]
+    elif args.dijkstra:
+        algorithm = ALGORITHMS["dijkstra"]
+    elif args.astar:
+        algorithm = ALGORITHMS["astar"]
+    elif args.pareto:
+        algorithm = ALGORITHMS["pareto"]
+    elif args.csa:
+        algorithm = ALGORITHMS["csa"]
     logging.info("Using algorithm {}".format(algorithm["label"]))
+    queue = QUEUES[args.queue]
+    logging.info("Using priority queue {}".format(queue["label"]))
+
+    if args.output is not None:
+        sol_file = args.output
+    elif args.client == "-":
+        sol_file = "-"
+    else:
+        sol_file = args.client[:args.client.rfind('.')]+".sol"
+
+    # count what the searches do
+    stats_file = None
+    algorithm_class = algorithm["class"]
+    if args.stats is not None:
+        named = sol_file if sol_file != "-" else args.client
+        stats_file = (named[:named.rfind('.')] +
+                      StatsWriter.FORMATS[args.stats])
+        algorithm_class = instrument(algorithm_class)
+        logging.info("Writing the search counters to {}".format(stats_file))
+
+    if args.cprofile is not None:
+        routing_profile = cProfile.Profile()
+        routing_profile.enable()
 
     # route all the clients
-    route_clients(args.client[:args.client.rfind('.')]+".sol",
-                  clients,
+    route_clients(sol_file,
+                  args.client,
                   route_map,
-                  algorithm["class"],
+                  algorithm_class,
+                  queue["class"],
                   args.secondary_optimization,
                   args.runs,
                   args.no_sol,
-                  args.print_solution)
+                  args.print_solution,
+                  args.jobs,
+                  ResultCache(args.result_cache) if args.result_cache > 0
+                  else None,
+                  args.batch_size,
+                  stats_file,
+                  args.stats,
+                  profiler if profiling else None)
 
+    if args.cprofile is not None:
+        routing_profile.disable()
+        routing_profile.dump_stats(args.cprofile)
+        logging.info("Saved the routing profile to {}".format(args.cprofile))
 
-def route_clients(sol_file, clients, route_map, algorithm, sec_optim, runs, write_solution, print_solution):
+    if profiling:
+        profiler.report()
+    if args.trace is not None:
+        profiler.save(args.trace)
+        logging.info("Saved the trace to {}".format(args.trace))
+
+
+def open_file(filename, mode):
+    """ Opens a file, or the standard input or output.
+
+    Args:
+        filename (str): Name of the file, - for the standard input or output.
+        mode (str): Mode in which the file is opened.
+
+    Returns:
+        The file object. Closing it leaves the standard streams open.
+    """
+
+    if filename == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        return open(stream.fileno(), mode, closefd=False)
+    return open(filename, mode)
+
+
+def route_clients(sol_file, client_file, route_map, algorithm, queue, sec_optim, runs, write_solution, print_solution, jobs=1, cache=None, batch_size=BATCH_SIZE, stats_file=None, stats_format="csv", profiler=None):
     """ Routes all the clients.
 
+    The clients are parsed as they are routed, and the paths are written in
+    batches as they come, so only a batch of clients is kept in memory at
+    once, unless the batch size is not positive.
+
     Args:
-        sol_file (file): Name of the output file with all the routes.
-        clients: All the Client objects.
+        sol_file (str): Name of the output file with all the routes.
+        client_file (str): Name of the file with the clients' requests.
         route_map (RouteMap): RouteMap object.
         algorithm: Class of the algorithm chosen by the user.
+        queue: Class of the priority queue backend chosen by the user.
         sec_optim (bool): Optimize secondary weight.
         print_solution (bool): Print solution to stdout.
+        jobs (int): Number of processes routing the clients.
+        cache (ResultCache): Cache of the routes already found, if any.
+        batch_size (int): Number of clients read, grouped and routed at once,
+            all of them if not positive.
+        stats_file (str): Name of the file where the counters of the
+            searches are written, if the algorithm is instrumented.
+        stats_format (str): Format of the counters file.
+        profiler (Profiler): Times the reading of the clients, the routing
+            and the writing of the paths, if any.
 
     """
 
-    sol = open(sol_file, 'w') # Output file.
+    sol = open_file(sol_file, 'w') if write_solution else None # Output file.
+    stats = None
+    if stats_file is not None:
+        stats = StatsWriter(open(stats_file, 'w', newline=''), stats_format)
 
     logging.debug("Fulfilling clients' requests")
     for run in range(runs):
-        for client in clients:
-            logging.debug("Taking care of client {}".format(client))
-            # Route a client and receive its path.
-            path = clients[client].route(route_map, algorithm, sec_optim)
-            logging.debug("{}".format(path))
-            if write_solution:
-                sol.write(path + "\n")
-            if print_solution:
-                print(path)
-            logging.debug("Done with client {}".format(client))
+        with open_file(client_file, 'r') as clients_in:
+            clients = read_clients(clients_in)
+            if profiler is not None:
+                clients = profiler.timed("client parse", clients)
+            if jobs > 1:
+                # The paths come back in the order of the clients.
+                paths = route_parallel(clients, route_map, algorithm, queue,
+                                       sec_optim, jobs, cache, batch_size,
+                                       profiler)
+            else:
+                paths = route_serial(clients, route_map, algorithm, queue,
+                                     sec_optim, cache, batch_size, profiler)
+            if profiler is not None:
+                paths = profiler.timed("routing", paths)
+                write = profiler.phase
+            else:
+                write = _untimed
+
+            lines = []
+            for count, path in enumerate(paths, 1):
+                if sol is not None:
+                    lines.append(path + "\n")
+                    if len(lines) >= WRITE_BATCH:
+                        with write("write", False):
+                            sol.writelines(lines)
+                        lines = []
+                if stats is not None and count % WRITE_BATCH == 0:
+                    stats.write(drain())
+                if print_solution:
+                    print(path)
+            with write("write", False):
+                if sol is not None:
+                    sol.writelines(lines)
+                    sol.flush()
+            if stats is not None:
+                stats.write(drain())
 
         logging.debug("Finished fulfilling clients' requests")
 
+    if sol is not None:
+        sol.close()
+    if stats is not None:
+        stats.stats_file.close()
+
+    # The workers keep their own copies of the cache.
+    if cache is not None and jobs <= 1:
+        logging.info("Result cache: {}".format(cache))
+
+
+def _untimed(name, span=True):
+    """ Stands for Profiler.phase when the run is not profiled.
+
+    Returns:
+        A context manager which does nothing.
+    """
+    return nullcontext()
+
+
+def route_serial(clients, route_map, algorithm, queue, sec_optim, cache=None, batch_size=BATCH_SIZE, profiler=None):
+    """ Routes the clients one group after the other.
+
+    The clients of each batch which only differ in the goal share the same
+    search when the algorithm allows it.
+
+    Args:
+        clients: All the Client objects.
+        route_map (RouteMap): RouteMap object.
+        algorithm: Class of the algorithm chosen by the user.
+        queue: Class of the priority queue backend chosen by the user.
+        sec_optim (bool): Optimize secondary weight.
+        cache (ResultCache): Cache of the routes already found, if any.
+        batch_size (int): Number of clients grouped at once, all of them if
+            not positive.
+        profiler (Profiler): Traces the search of each group, if any.
+
+    Yields:
+        The path of each client.
+    """
+
+    # The messages of each group are only formatted when they are logged.
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    tracing = profiler is not None and profiler.events is not None
+
+    def results(batch):
+        for group in group_clients(batch, algorithm.MULTI_GOAL):
+            if debug:
+                logging.debug("Taking care of clients %s",
+                              [client.number for client in group])
+            if tracing:
+                start = perf_counter()
+            # Route the group and receive their paths.
+            paths = route_group(group, route_map, algorithm, sec_optim, queue,
+                                cache)
+            if tracing:
+                profiler.group([client.number for client in group], start,
+                               perf_counter())
+            logging.debug("%s", paths)
+            yield paths
+            if debug:
+                logging.debug("Done with clients %s",
+                              [client.number for client in group])
+
+    for batch in batches(clients, batch_size):
+        numbers = [client.number for client in batch]
+        for path in in_client_order(numbers, results(batch)):
+            yield path
+
 if __name__ == '__main__':
     main()
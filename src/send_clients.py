@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+""" Client of the routing server
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import asyncio
+import sys
+
+
+async def send(requests, answers, unix=None, host=None, port=None):
+    """ Sends the clients' requests to the routing server and writes back
+        its answers.
+
+    The requests are sent while the answers are read, so neither side waits
+    for the other.
+
+    Args:
+        requests (file): File object with the clients' requests.
+        answers (file): File object where the answers are written.
+        unix (str): Path of the Unix socket of the server, if any.
+        host (str): Address of the server.
+        port (int): TCP port of the server.
+    """
+    if unix is not None:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    async def write():
+        for line in requests:
+            writer.write(line.encode())
+            await writer.drain()
+        writer.write_eof()
+
+    sending = asyncio.ensure_future(write())
+    async for line in reader:
+        answers.write(line.decode())
+    await sending
+    writer.close()
+    await writer.wait_closed()
+
+
+def main():
+    """ Sends a client file to the routing server.
+    """
+
+    parser = ArgumentParser(description="Route a client file on the routing \
+                                server",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("client",
+                        help="file where all clients' requests are defined \
+                            (- for the standard input)")
+    parser.add_argument("-o", "--output",
+                        help="solution file (- for the standard output)",
+                        default="-")
+    parser.add_argument("-u", "--unix",
+                        help="path of the Unix socket of the server, instead \
+                            of TCP")
+    parser.add_argument("--host",
+                        help="address of the server",
+                        default="127.0.0.1")
+    parser.add_argument("-p", "--port",
+                        help="TCP port of the server",
+                        type=int,
+                        default=7070)
+    args = parser.parse_args()
+
+    requests = sys.stdin if args.client == "-" else open(args.client, 'r')
+    answers = sys.stdout if args.output == "-" else open(args.output, 'w')
+    try:
+        asyncio.run(send(requests, answers, args.unix, args.host, args.port))
+    finally:
+        requests.close()
+        answers.close()
+
+if __name__ == '__main__':
+    main()
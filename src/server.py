@@ -0,0 +1,372 @@
+#!/usr/bin/python3
+""" Routing server
+"""
+
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+from time import perf_counter
+
+from client import Client
+from contraction import ContractionHierarchy
+from landmarks import LandmarkTable
+from result_cache import ResultCache
+from routemap import RouteMap
+from run import ALGORITHMS, QUEUES
+
+# Route map and search settings of the worker process.
+_state = None
+
+
+def _init_worker(state):
+    """ Stores the routing state in a worker process.
+
+    Args:
+        state: Tuple with the RouteMap, algorithm, queue, sec_optim,
+            ResultCache and UpdateJournal.
+    """
+    global _state
+    _state = state
+    # SIGHUP is for the server, which was forked with its signal handlers.
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.set_wakeup_fd(-1)
+
+
+def _route(client):
+    """ Routes a client in a worker process.
+
+    Args:
+        client (Client): The client to route.
+
+    Returns:
+        The line of the solution file of the client.
+    """
+    route_map, algorithm, queue, sec_optim, cache, journal = _state
+    if journal is not None:
+        journal.follow(cache)
+    return client.route(route_map, algorithm, sec_optim, queue, cache)
+
+
+class UpdateJournal(object):
+    """ The delta files applied to the route map of the server, for the
+        workers to apply them too.
+
+    The server appends each delta to a temporary file shared with the
+    workers, and then publishes the new size of the file in shared memory.
+    Before each request, a worker reads what was appended since its last
+    one, so that looking for changes only reads a shared integer.
+
+    Attributes:
+        route_map (RouteMap): The route map of the process.
+        journal (file): Temporary file with the deltas.
+        size (Value): Size of the deltas in the file, shared by every process.
+        position (int): Size of the deltas applied to the route map of the
+            process.
+    """
+
+    def __init__(self, route_map, context):
+        """ Initialize an UpdateJournal, before the workers start.
+
+        Args:
+            route_map (RouteMap): The route map of the server.
+            context: Multiprocessing context of the workers.
+        """
+        self.route_map = route_map
+        self.journal = tempfile.TemporaryFile()
+        self.size = context.RawValue('q', 0)
+        self.position = 0
+
+    def append(self, delta):
+        """ Applies a delta to the route map of the server, and passes it to
+            the workers.
+
+        Args:
+            delta (str): The lines of the delta file.
+
+        Returns:
+            The connections added or improved, and the ones removed or
+            replaced.
+
+        Raises:
+            ValueError: If the delta has an invalid change, then nothing is
+                applied.
+        """
+        changes = self.route_map.update(delta.splitlines())
+        data = (delta.rstrip("\n") + "\n").encode()
+        os.pwrite(self.journal.fileno(), data, self.position)
+        self.position += len(data)
+        self.size.value = self.position
+        return changes
+
+    def follow(self, cache=None):
+        """ Applies the deltas appended since the last call, in a worker.
+
+        Args:
+            cache (ResultCache): Routes of the worker, if any.
+        """
+        size = self.size.value
+        if size == self.position:
+            return
+        delta = os.pread(self.journal.fileno(), size - self.position,
+                         self.position).decode()
+        self.position = size
+        added, removed = self.route_map.update(delta.splitlines())
+        if cache is not None:
+            cache.invalidate(added, removed)
+
+
+class RoutingServer(object):
+    """ Routes the clients' requests sent over a socket.
+
+    Each connection sends lines in the format of the client file, and gets
+    back the lines of the solution file in the same order, as soon as they
+    are found. A line which is not a request gets an error line instead.
+    The searches run in a pool of worker processes, which keep the route map
+    loaded by the server.
+
+    A connection only has a few requests routed at once. When they are not
+    answered, or the answers are not read, the server stops reading the
+    connection until they are.
+
+    With a delta file, every SIGHUP applies it to the route map, and each
+    worker applies it before routing its next request.
+
+    Attributes:
+        PENDING (int): Requests of a connection routed or waiting to be
+            written at once.
+        executor (ProcessPoolExecutor): The worker processes.
+        journal (UpdateJournal): Passes the deltas to the workers, None
+            without a delta file.
+        delta (str): Name of the delta file, if any.
+    """
+
+    PENDING = 64
+
+    def __init__(self, executor, journal=None, delta=None):
+        """ Initialize a RoutingServer.
+
+        Args:
+            executor (ProcessPoolExecutor): The worker processes.
+            journal (UpdateJournal): Passes the deltas to the workers.
+            delta (str): Name of the delta file, if any.
+        """
+        self.executor = executor
+        self.journal = journal
+        self.delta = delta
+
+    async def handle(self, reader, writer):
+        """ Answers the requests of a connection.
+
+        Args:
+            reader (StreamReader): Lines sent by the connection.
+            writer (StreamWriter): Where the answers are written.
+        """
+        peer = writer.get_extra_info("peername")
+        logging.debug("Connection from %s", peer)
+        pending = asyncio.Queue(self.PENDING)
+        answering = asyncio.ensure_future(self.answer(pending, writer))
+        loop = asyncio.get_running_loop()
+
+        try:
+            async for raw in reader:
+                line = raw.decode().strip()
+                # The line with the number of clients is not a request.
+                if len(line.split()) <= 1:
+                    continue
+                try:
+                    client = Client(line)
+                except (ValueError, IndexError, KeyError) as error:
+                    answer = loop.create_future()
+                    answer.set_result("error {}: {}".format(line, error))
+                else:
+                    answer = loop.run_in_executor(self.executor, _route,
+                                                  client)
+                await pending.put(answer)
+        except ConnectionError:
+            pass
+
+        await pending.put(None)
+        await answering
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+        logging.debug("Connection from %s closed", peer)
+
+    async def answer(self, pending, writer):
+        """ Writes the answers of a connection in the order of the requests.
+
+        Args:
+            pending (Queue): The futures of the answers, None after the last
+                one.
+            writer (StreamWriter): Where the answers are written.
+        """
+        while True:
+            answer = await pending.get()
+            if answer is None:
+                return
+            try:
+                line = await answer
+            except Exception as error:
+                logging.warning("Routing failed: %s", error)
+                line = "error {}".format(error)
+            try:
+                writer.write((line + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                # Nobody reads the answers anymore, the rest are dropped.
+                while await pending.get() is not None:
+                    pass
+                return
+
+    def update(self):
+        """ Applies the delta file to the route map.
+        """
+        start = perf_counter()
+        contraction = self.journal.route_map.contraction
+        try:
+            with open(self.delta, 'r') as delta_file:
+                added, removed = self.journal.append(delta_file.read())
+        except (OSError, ValueError) as error:
+            logging.error("Could not apply {}: {}".format(self.delta, error))
+            return
+        logging.info("Applied {} in {:.1f} ms: {} connections added or "
+                     "improved, {} removed or replaced".format(
+                         self.delta, 1000 * (perf_counter() - start),
+                         len(added), len(removed)))
+        if (contraction is not None and
+                self.journal.route_map.contraction is None):
+            logging.warning("The contraction hierarchy does not match the "
+                            "changed costs, it is not used until the server "
+                            "restarts")
+
+    async def serve(self, unix=None, host=None, port=None):
+        """ Accepts connections until the server is stopped.
+
+        Args:
+            unix (str): Path of the Unix socket, if any.
+            host (str): Address the TCP socket is bound to.
+            port (int): Port of the TCP socket.
+        """
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        if self.delta is not None:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP,
+                                                          self.update)
+        for sock in server.sockets:
+            logging.info("Listening on {}".format(sock.getsockname()))
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """ Loads a route map and serves the clients' requests.
+    """
+
+    parser = ArgumentParser(description="Serve the clients' requests over a \
+                                socket",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("routemap",
+                        help="file where the map is defined")
+    parser.add_argument("-a", "--algorithm",
+                        choices=ALGORITHMS.keys(),
+                        default="dijkstra",
+                        help="search engine")
+    parser.add_argument("-q", "--queue",
+                        choices=QUEUES.keys(),
+                        default="heap",
+                        help="Priority queue backend")
+    parser.add_argument("-s", "--secondary-optimization",
+                        action="store_true",
+                        help="Enable secondary parameter optimization")
+    parser.add_argument("-ch", "--contraction",
+                        help="answer the custo clients without constraints \
+                            on the connections from the contraction \
+                            hierarchy saved next to the map file",
+                        action="store_true")
+    parser.add_argument("-rc", "--result-cache",
+                        help="number of routes kept by each worker to answer \
+                            repeated requests without searching (0 disables \
+                            it)",
+                        type=int,
+                        default=0)
+    parser.add_argument("-d", "--delta",
+                        help="delta file with changes to the connections, \
+                            applied each time the server gets SIGHUP")
+    parser.add_argument("-j", "--jobs",
+                        help="number of processes routing the clients",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument("-u", "--unix",
+                        help="path of the Unix socket to listen on, instead \
+                            of TCP")
+    parser.add_argument("--host",
+                        help="address to listen on",
+                        default="127.0.0.1")
+    parser.add_argument("-p", "--port",
+                        help="TCP port to listen on",
+                        type=int,
+                        default=7070)
+    parser.add_argument("-v", "--verbosity",
+                        help="verbosity", action="count",
+                        default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(message)s',
+                        datefmt='%Y/%m/%d %H:%M:%S',
+                        level=logging.DEBUG if args.verbosity
+                        else logging.INFO)
+
+    logging.info("Loading the route map")
+    route_map = RouteMap(args.routemap)
+    # Built before the workers start, so that they share them.
+    if args.algorithm == "astar":
+        route_map.landmarks = LandmarkTable.load_or_build(route_map,
+                                                          args.routemap,
+                                                          LandmarkTable.COUNT,
+                                                          False)
+    if args.contraction:
+        route_map.contraction = ContractionHierarchy.load_or_build(
+            route_map, args.routemap, True)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    cache = (ResultCache(args.result_cache) if args.result_cache > 0
+             else None)
+    journal = (UpdateJournal(route_map, context) if args.delta is not None
+               else None)
+    executor = ProcessPoolExecutor(
+        max(1, args.jobs),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=((route_map, ALGORITHMS[args.algorithm]["class"],
+                   QUEUES[args.queue]["class"], args.secondary_optimization,
+                   cache, journal),))
+
+    # The workers are forked at the first request, start them before the
+    # server listens so that they do not keep its sockets open.
+    executor.submit(int).result()
+
+    server = RoutingServer(executor, journal, args.delta)
+    try:
+        asyncio.run(server.serve(args.unix, args.host, args.port))
+    except KeyboardInterrupt:
+        logging.info("Stopping the server")
+    finally:
+        executor.shutdown()
+        if args.unix is not None and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+""" Elementary trips timetable
+"""
+
+from array import array
+
+from routemap import Connection
+
+
+class Timetable(object):
+    """ Every trip of a day of the route map, sorted by departure.
+
+    Each periodic arc is unrolled into its trips between the first one and
+    the last one of the day. The trips repeat every day, so a scan over
+    several days goes through the same arrays once per day, adding a day to
+    the times of each lap.
+
+    Attributes:
+        departure (array): Time of the day of each trip.
+        arc (array): Arc of the route map taken by each trip.
+        origin (array): City where each trip leaves from.
+    """
+
+    def __init__(self, route_map):
+        """ Unrolls the arcs of a route map.
+
+        Args:
+            route_map (RouteMap): RouteMap object.
+        """
+        trips = []
+        for city in range(len(route_map.offsets) - 1):
+            for arc in route_map.arcs(city):
+                for departure in range(route_map.ti[arc],
+                                       min(route_map.last[arc],
+                                           Connection.DAY - 1) + 1,
+                                       route_map.period[arc]):
+                    trips.append((departure, route_map.duration[arc], arc,
+                                  city))
+        trips.sort()
+
+        self.departure = array('i', (trip[0] for trip in trips))
+        self.arc = array('i', (trip[2] for trip in trips))
+        self.origin = array('i', (trip[3] for trip in trips))
+
+    def __len__(self):
+        return len(self.departure)
@@ -2,6 +2,7 @@
 """
 
 from general_search import GeneralSearch
+from frontier import FifoFrontier, LifoFrontier, HeapFrontier
 
 
 class DepthFirstSearch(GeneralSearch):
@@ -10,6 +11,10 @@ class DepthFirstSearch(GeneralSearch):
     Inherits from GeneralSearch class.
     """
 
+    def new_open_list(self):
+        """ Creates a stack for the open nodes. """
+        return LifoFrontier()
+
     def select(self):
         """ Returns the last opened node. """
 
@@ -21,6 +26,59 @@ class BreadthFirstSearch(GeneralSearch):
     Inherits from GeneralSearch class.
     """
 
+    def new_open_list(self):
+        """ Creates a queue for the open nodes. """
+        return FifoFrontier()
+
     def select(self):
         """ Returns the first opened node. """
-        return self.open_list.pop(0)
+        return self.open_list.pop()
+
+
+class UniformCostSearch(GeneralSearch):
+    """ Uniform Cost Search (Dijkstra)
+
+    Inherits from GeneralSearch class. Each node is settled at most once, when
+    it leaves the open list with the lowest priority, and the search stops as
+    soon as every goal is settled.
+
+    Attributes:
+        closed (set): Numbers of the settled nodes.
+        goals_left (int): Number of goals not selected yet.
+    """
+
+    def initialize(self):
+        """ Initialize the settled nodes besides the route and open list. """
+        self.closed = set()
+        self.goals_left = self.goal_count()
+        super().initialize()
+
+    def new_open_list(self):
+        """ Creates a binary heap for the open nodes. """
+        return HeapFrontier()
+
+    def insert_open(self, number):
+        """ Inserts or updates a node in the binary heap. """
+        self.open_list.push(number, self.evaluate(number))
+
+    def finished(self):
+        """ Tests if every goal was settled or open_list is empty. """
+        return not self.goals_left or super().finished()
+
+    def select(self):
+        """ Settles and returns the opened node with the lowest priority. """
+        number = self.open_list.pop()
+        self.closed.add(number)
+        if self.is_goal(number):
+            self.goals_left -= 1
+        return number
+
+    def expand_node(self, number):
+        """ Expands a node, unless it was the last goal left. """
+        if self.goals_left:
+            super().expand_node(number)
+
+    def check_node(self, number, *candidate):
+        """ Settled nodes are never opened again. """
+        return (number not in self.closed and
+                super().check_node(number, *candidate))